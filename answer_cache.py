@@ -0,0 +1,63 @@
+"""Per-employee answers to the HR-data questions ("my salary", "ملفي", ...).
+
+Entries are keyed by (ECODE, data version, intent) and hold the projected table and,
+once requested, the profile PDF bytes. The cache is bounded by total size, entries
+expire after ASKHR_ANSWER_TTL seconds, and a new data version never sees an older
+version's entries. When the data watcher reports a reload, entries of employees
+whose rows did not change are carried over to the new version and the rest dropped.
+"""
+import os
+from collections import namedtuple
+
+from caching import LRUCache
+from pdfs import render_employee_pdf
+import metrics
+
+ANSWER_TTL = float(os.environ.get("ASKHR_ANSWER_TTL", "600"))
+ANSWER_CACHE_MB = int(os.environ.get("ASKHR_ANSWER_CACHE_MB", "32"))
+
+Answer = namedtuple("Answer", ["ecode", "label", "table", "pdf"])
+
+
+def answer_size(answer):
+    return int(answer.table.memory_usage(index=True, deep=True).sum()) + len(answer.pdf or b"")
+
+
+answer_cache = LRUCache(max_items=10_000, max_bytes=ANSWER_CACHE_MB * 1024 * 1024, sizeof=answer_size,
+                        ttl=ANSWER_TTL)
+metrics.register_cache("answers", answer_cache)
+
+
+def employee_answer(store, ecode, intent, with_pdf=False):
+    """Answer for ``ecode``'s ``intent`` against ``store``; ``with_pdf`` also renders the profile PDF."""
+    key = (ecode, store.version, intent)
+    answer = answer_cache.get(key)
+    # The ECODE check is belt and braces: a key can only ever hold that employee's rows
+    if answer is None or answer.ecode != ecode:
+        label, table = store.view(ecode, intent)
+        # Copy so a cached slice does not pin the whole (possibly superseded) frame in memory
+        answer = Answer(ecode, label, table.copy(), None)
+        if store.version is None:
+            # Unversioned store: nothing safe to key on, so answer without caching
+            if with_pdf and not table.empty:
+                answer = answer._replace(pdf=render_employee_pdf(store.row(ecode)))
+            return answer
+        answer_cache.put(key, answer)
+    if with_pdf and answer.pdf is None and not answer.table.empty:
+        # Adding the PDF does not extend the answer's lifetime
+        answer = answer_cache.replace(key, answer._replace(pdf=render_employee_pdf(store.row(ecode))))
+    return answer
+
+
+def on_data_change(diff):
+    """DataWatcher subscriber: keep unchanged employees' answers, drop the changed and removed ones."""
+    stale = diff.changed | diff.removed
+    for key in answer_cache.keys():
+        ecode, version, intent = key
+        if version != diff.old_version:
+            continue
+        if ecode in stale:
+            answer_cache.discard(key)
+        else:
+            # Same entry under the new version: its original expiry still applies
+            answer_cache.rekey(key, (ecode, diff.new_version, intent))
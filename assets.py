@@ -0,0 +1,94 @@
+import hashlib
+import os
+from io import BytesIO
+
+from PIL import Image, ImageOps, features
+
+from caching import CACHE_DIR, LRUCache, atomic_write
+import metrics
+
+ASSET_DIR = os.path.join(CACHE_DIR, "assets")
+GALLERY_DIR = "hr_team_photos"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+# Display widths used by the UI (px)
+LOGO_WIDTH = 150
+BANNER_WIDTH = 600
+GALLERY_COLUMNS = 3
+GALLERY_WIDTH = 400
+
+FORMAT = "WEBP" if features.check("webp") else "JPEG"
+QUALITY = 82
+
+# Encoded derivatives, shared by all sessions of this process
+asset_cache = LRUCache(max_items=64, max_bytes=16 * 1024 * 1024)
+metrics.register_cache("assets", asset_cache)
+_digests = {}
+
+
+def _source_digest(path):
+    # Hash each source once per (mtime, size) instead of on every rerun
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    digest = _digests.get(key)
+    if digest is None:
+        with open(path, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:16]
+        _digests[key] = digest
+    return digest
+
+
+@metrics.timed_fn("asset_encode")
+def _encode(path, width):
+    with Image.open(path) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.width > width:
+            im = im.resize((width, round(im.height * width / im.width)), Image.LANCZOS)
+        fmt = FORMAT
+        if fmt == "JPEG" and im.mode in ("RGBA", "LA", "P"):
+            fmt = "PNG"  # keep transparency when WebP is unavailable
+        elif fmt == "JPEG" and im.mode != "RGB":
+            im = im.convert("RGB")
+        buf = BytesIO()
+        options = {"quality": QUALITY, "method": 4} if fmt == "WEBP" else {"quality": QUALITY}
+        im.save(buf, format=fmt, **options)
+        return buf.getvalue(), fmt.lower()
+
+
+def derivative(path, width):
+    """Downscaled image bytes for ``path`` at ``width`` px, cached on disk by source hash and in memory."""
+    digest = _source_digest(path)
+    key = (digest, width)
+    data = asset_cache.get(key)
+    if data is not None:
+        return data
+    stem = os.path.splitext(os.path.basename(path))[0]
+    for ext in ("webp", "jpeg", "png"):
+        cached = os.path.join(ASSET_DIR, f"{stem}-{digest}-{width}.{ext}")
+        if os.path.exists(cached):
+            with open(cached, "rb") as f:
+                return asset_cache.put(key, f.read())
+    data, ext = _encode(path, width)
+    try:
+        os.makedirs(ASSET_DIR, exist_ok=True)
+        atomic_write(os.path.join(ASSET_DIR, f"{stem}-{digest}-{width}.{ext}"), data)
+    except OSError:
+        pass
+    return asset_cache.put(key, data)
+
+
+def gallery_images(directory=GALLERY_DIR):
+    """Photos in the HR team gallery, in file-name order."""
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return []
+    return [os.path.join(directory, n) for n in names if n.lower().endswith(IMAGE_EXTENSIONS)]
+
+
+def prewarm_assets():
+    paths = [("logo.png", LOGO_WIDTH), ("middle_banner_image.png", BANNER_WIDTH)]
+    paths += [(p, GALLERY_WIDTH) for p in gallery_images()]
+    for path, width in paths:
+        derivative(path, width)
+    return len(paths)
@@ -0,0 +1,218 @@
+"""Microbenchmarks for the app's hot paths, run without the Streamlit UI.
+
+Synthetic workloads (default: 10k employees, 10k mixed English/Arabic queries) are
+built from the real workbook and trigger lists. Each benchmark reports p50/p95/p99
+latency and the peak Python allocation of one call; results can be saved as a
+baseline and compared against later runs.
+
+    python bench.py --save bench_baseline.json
+    python bench.py --compare bench_baseline.json --threshold 0.2
+    python bench.py --only match_policy_section,authenticate --queries 2000
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+import pandas as pd
+
+from answer_cache import employee_answer
+from employee_store import EmployeeStore, authenticate
+from matcher import EMPLOYEE_VIEWS, load_triggers, match_policy_section, match_employee_question
+from pdfs import generate_employee_pdf, generate_policy_section_pdf
+from policy_doc import POLICY_PATH, parse_policy_sections
+from snapshot import build_snapshot, load_frames, read_sources
+
+FILLER_EN = ["what is", "can you tell me about", "how does", "please explain", "i want to know", "hello",
+             "what happens with", "question about", "details on", "the company rules for"]
+FILLER_AR = ["ما هو", "اريد ان اعرف", "كيف", "سؤال عن", "مرحبا", "ما هي", "هل يمكن", "بخصوص"]
+FREE_TEXT = ["where is the parking", "cafeteria menu today", "printer not working", "meeting room booking",
+             "متى الاجتماع", "اين الموقف", "wifi password", "team lunch friday"]
+
+
+# ===== Workloads =====
+def synth_employees(n, seed=0):
+    """``n`` employees sampled from the real sheet, with unique ECODEs and random 3-digit PINs."""
+    rng = random.Random(seed)
+    df, pin_df = read_sources()
+    rows = df.sample(n=n, replace=True, random_state=seed).reset_index(drop=True)
+    rows["ECODE"] = [f"E{i:06d}" for i in range(n)]
+    pins = pd.DataFrame({"ECODE": rows["ECODE"], "Name": rows.get("Name", ""),
+                         "PIN": [rng.randint(100, 999) for _ in range(n)]})
+    return rows, pins
+
+
+def synth_queries(n, seed=0):
+    """Mixed English/Arabic queries: trigger phrases in filler, upper-cased variants and free text."""
+    rng = random.Random(seed)
+    triggers = load_triggers()
+    phrases = list(triggers.get("hr_team", [])) + list(triggers["policy_all"]["any"])
+    for entry in triggers.get("policy_special", []):
+        for clause in entry.get("all") or [entry.get("any", [])]:
+            phrases += clause
+    for group in ("policy_sections", "employee"):
+        for keywords in triggers[group].values():
+            phrases += keywords
+    out = []
+    for _ in range(n):
+        roll = rng.random()
+        if roll < 0.15:
+            out.append(rng.choice(FREE_TEXT))
+            continue
+        phrase = rng.choice(phrases)
+        filler = rng.choice(FILLER_AR if phrase[:1] >= "؀" else FILLER_EN)
+        q = f"{filler} {phrase}?"
+        out.append(q.upper() if roll > 0.9 else q)
+    return out
+
+
+# ===== Measurement =====
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def run(fn, inputs, warmup=3):
+    """Time ``fn(*args)`` for each args tuple; peak memory comes from one extra traced call."""
+    inputs = list(inputs)
+    for args in inputs[:warmup]:
+        fn(*args)
+    samples = []
+    clock = time.perf_counter_ns
+    for args in inputs:
+        t0 = clock()
+        fn(*args)
+        samples.append(clock() - t0)
+    tracemalloc.start()
+    fn(*inputs[0])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    samples.sort()
+    return {
+        "n": len(samples),
+        "mean_us": sum(samples) / len(samples) / 1000,
+        "p50_us": percentile(samples, 0.50) / 1000,
+        "p95_us": percentile(samples, 0.95) / 1000,
+        "p99_us": percentile(samples, 0.99) / 1000,
+        "peak_kb": peak / 1024,
+    }
+
+
+# ===== Benchmarks =====
+def build_benchmarks(employees, queries, workdir):
+    rng = random.Random(1)
+    df, pin_df = synth_employees(employees)
+    store = EmployeeStore(df, pin_df, version="bench")
+    ecodes = store.ecodes()
+    with open(POLICY_PATH, "r", encoding="utf-8") as f:
+        policy_text = f.read()
+    sections = parse_policy_sections(policy_text)
+    numbered = [(t, c) for t, c in sections.items() if t[:1].isdigit()]
+    qs = synth_queries(queries)
+
+    xlsx = os.path.join(workdir, "employees.xlsx")
+    pins = os.path.join(workdir, "pins.csv")
+    df.to_excel(xlsx, index=False)
+    pin_df.to_csv(pins, index=False)
+    snap_dir = os.path.join(workdir, "snapshot")
+    build_snapshot(xlsx, pins, snap_dir)
+
+    pin_of = dict(zip(pin_df["ECODE"], pin_df["PIN"].astype(str)))
+    logins = []
+    for _ in range(queries):
+        ecode = rng.choice(ecodes)
+        pin = pin_of[ecode] if rng.random() < 0.5 else "000"
+        logins.append((ecode if rng.random() < 0.95 else "E999999999", pin))
+
+    return {
+        "match_policy_section": (match_policy_section, [(q, sections) for q in qs]),
+        "match_employee_question": (match_employee_question,
+                                    [(q, store.row(rng.choice(ecodes))) for q in qs]),
+        "authenticate": (lambda e, p: authenticate(e, p, store), logins),
+        "store_row": (store.row, [(e,) for e, _ in logins]),
+        "store_view": (store.view, [(e, rng.choice(list(EMPLOYEE_VIEWS))) for e, _ in logins]),
+        # A few hundred employees asking repeatedly: mostly cache hits after the first round
+        "employee_answer": (lambda e, i: employee_answer(store, e, i),
+                            [(ecodes[rng.randrange(300)], rng.choice(list(EMPLOYEE_VIEWS))) for _ in range(queries)]),
+        "load_data_xlsx": (lambda: read_sources(xlsx, pins), [()] * 3),
+        "load_data_snapshot": (lambda: load_frames(xlsx, pins, snap_dir), [()] * 20),
+        "parse_policy_sections": (parse_policy_sections, [(policy_text,)] * 200),
+        "generate_policy_section_pdf": (lambda t, c: generate_policy_section_pdf(t, c, BytesIO()), numbered * 3),
+        "generate_employee_pdf": (lambda e: generate_employee_pdf(store.row(e), BytesIO()),
+                                  [(rng.choice(ecodes),) for _ in range(100)]),
+    }
+
+
+# ===== Reporting =====
+def compare(results, baseline, threshold):
+    """Print p50/p95 deltas against ``baseline``; returns names that regressed by more than ``threshold``."""
+    regressions = []
+    print(f"\n{'benchmark':32} {'p50 base':>10} {'p50 now':>10} {'Δ':>8} {'p95 base':>10} {'p95 now':>10} {'Δ':>8}")
+    for name, r in results.items():
+        b = baseline.get("results", {}).get(name)
+        if b is None:
+            print(f"{name:32} {'—':>10}")
+            continue
+        d50 = r["p50_us"] / b["p50_us"] - 1 if b["p50_us"] else 0.0
+        d95 = r["p95_us"] / b["p95_us"] - 1 if b["p95_us"] else 0.0
+        flag = "  REGRESSION" if max(d50, d95) > threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:32} {b['p50_us']:10.1f} {r['p50_us']:10.1f} {d50:+8.1%} "
+              f"{b['p95_us']:10.1f} {r['p95_us']:10.1f} {d95:+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks for Ask HR hot paths.")
+    parser.add_argument("--employees", type=int, default=10_000)
+    parser.add_argument("--queries", type=int, default=10_000)
+    parser.add_argument("--only", help="comma-separated benchmark names")
+    parser.add_argument("--save", metavar="PATH", help="write results as JSON (e.g. a new baseline)")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="askhr-bench-") as workdir:
+        print(f"building workloads: {args.employees} employees, {args.queries} queries", file=sys.stderr)
+        benchmarks = build_benchmarks(args.employees, args.queries, workdir)
+        only = set(args.only.split(",")) if args.only else None
+        results = {}
+        print(f"{'benchmark':32} {'n':>6} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10} {'peak KiB':>10}")
+        for name, (fn, inputs) in benchmarks.items():
+            if only and name not in only:
+                continue
+            r = results[name] = run(fn, inputs)
+            print(f"{name:32} {r['n']:6d} {r['p50_us']:10.1f} {r['p95_us']:10.1f} {r['p99_us']:10.1f} "
+                  f"{r['peak_kb']:10.1f}", flush=True)
+
+    report = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                 "employees": args.employees, "queries": args.queries, "timestamp": time.time(),
+                 "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss},
+        "results": results,
+    }
+    print(f"\nmax RSS: {report['meta']['max_rss_kb'] / 1024:.1f} MiB")
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
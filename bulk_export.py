@@ -0,0 +1,112 @@
+"""Bulk HR export: every (or a filtered set of) employee profile PDF in one ZIP.
+
+Profiles are rendered across a process pool; each worker loads the data snapshot
+and registers the ReportLab fonts once, then receives only ECODEs. Finished PDFs
+are written straight into the archive as they arrive, with no temporary files.
+
+    python bulk_export.py -o profiles.zip
+    python bulk_export.py --ecode E0006 --ecode E0093 -o two.zip
+    python bulk_export.py --filter "Branch Code=WH001" -o - > wh001.zip
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+import zipfile
+
+from snapshot import XLSX_PATH, PIN_PATH, load_frames
+
+_store = None
+
+
+# ===== Workers =====
+def _init_worker(xlsx_path, pin_path):
+    global _store
+    import pdfs  # noqa: F401  registers the CID font once per worker
+    from employee_store import EmployeeStore
+    df, pin_df, version = load_frames(xlsx_path, pin_path)
+    _store = EmployeeStore(df, pin_df, version)
+
+
+def _render(ecode):
+    from pdfs import render_employee_pdf
+    return ecode, render_employee_pdf(_store.row(ecode))
+
+
+# ===== Selection =====
+def select_ecodes(df, ecodes=None, filters=None):
+    """ECODEs to export, in sheet order: all of them, narrowed by explicit codes and COLUMN=VALUE filters."""
+    rows = df
+    for expr in filters or ():
+        column, _, value = expr.partition("=")
+        if column not in rows.columns:
+            raise SystemExit(f"unknown column in filter: {column!r}")
+        rows = rows[rows[column].astype(str) == value]
+    selected = list(dict.fromkeys(rows["ECODE"].astype(str)))
+    if ecodes:
+        wanted = set(ecodes)
+        missing = wanted.difference(selected)
+        if missing:
+            print(f"skipping unknown or filtered-out ECODEs: {', '.join(sorted(missing))}", file=sys.stderr)
+        selected = [e for e in selected if e in wanted]
+    return selected
+
+
+# ===== Export =====
+def export_profiles(out, ecodes, workers=None, xlsx_path=XLSX_PATH, pin_path=PIN_PATH, progress=None,
+                    chunksize=4):
+    """Render ``ecodes`` in a process pool and stream them into a ZIP written to ``out``. Returns the count."""
+    done = 0
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as archive, \
+            multiprocessing.Pool(workers, initializer=_init_worker, initargs=(xlsx_path, pin_path)) as pool:
+        for ecode, pdf in pool.imap_unordered(_render, ecodes, chunksize=chunksize):
+            archive.writestr(f"employee_data_{ecode}.pdf", pdf)
+            done += 1
+            if progress:
+                progress(done, len(ecodes))
+    return done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export employee profile PDFs into a ZIP archive.")
+    parser.add_argument("-o", "--output", required=True, help="ZIP path, or '-' for stdout")
+    parser.add_argument("--ecode", action="append", help="export only this ECODE (repeatable)")
+    parser.add_argument("--ecodes-file", help="file with one ECODE per line")
+    parser.add_argument("--filter", action="append", metavar="COLUMN=VALUE", help="keep rows where COLUMN == VALUE")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--xlsx", default=XLSX_PATH)
+    parser.add_argument("--pins", default=PIN_PATH)
+    args = parser.parse_args(argv)
+
+    wanted = list(args.ecode or [])
+    if args.ecodes_file:
+        with open(args.ecodes_file, "r", encoding="utf-8") as f:
+            wanted += [line.strip() for line in f if line.strip()]
+    df, _, _ = load_frames(args.xlsx, args.pins)
+    ecodes = select_ecodes(df, wanted or None, args.filter)
+    if not ecodes:
+        print("nothing to export", file=sys.stderr)
+        return 1
+
+    workers = max(1, min(args.workers or 1, len(ecodes)))
+    start = time.perf_counter()
+
+    def progress(done, total):
+        elapsed = time.perf_counter() - start
+        print(f"\r{done}/{total} PDFs  {done / elapsed:.1f} PDFs/s", end="", file=sys.stderr, flush=True)
+
+    out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        n = export_profiles(out, ecodes, workers, args.xlsx, args.pins, progress)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(f"\nexported {n} profiles in {elapsed:.2f}s ({n / elapsed:.1f} PDFs/s) with {workers} workers",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# On-disk home for derived artifacts (policy index, data snapshots, ...); safe to delete
+CACHE_DIR = os.environ.get("ASKHR_CACHE_DIR", ".cache")
+
+
+def atomic_write(path, data):
+    """Write ``data`` (bytes, str, or a ``writer(file)`` callable) to ``path`` so readers never see a partial file.
+
+    Each call writes its own uniquely named temp file next to ``path`` and renames it over
+    the target, so concurrent writers of one file (threads or processes) cannot clobber
+    each other's half-written copy; the last rename wins.
+    """
+    tmp = tempfile.NamedTemporaryFile(dir=os.path.dirname(path) or ".", prefix=f"{os.path.basename(path)}.",
+                                      suffix=".tmp", delete=False)
+    try:
+        with tmp:
+            if callable(data):
+                data(tmp)
+            else:
+                tmp.write(data.encode("utf-8") if isinstance(data, str) else data)
+        os.chmod(tmp.name, 0o644)  # temp files are created owner-only; other replicas/users read these
+        os.replace(tmp.name, path)
+    except BaseException:
+        try:
+            os.remove(tmp.name)
+        except OSError:
+            pass
+        raise
+
+
+class LRUCache:
+    """Thread-safe LRU bounded by entry count and total size; shared by every session in the process.
+
+    With ``ttl`` (seconds) entries also expire that long after they were stored.
+    """
+
+    def __init__(self, max_items=128, max_bytes=64 * 1024 * 1024, sizeof=len, ttl=None):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                del self._data[key]
+                self._bytes -= entry[1]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def _store(self, key, value, size, expires):
+        # Caller holds the lock
+        old = self._data.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        if size > self.max_bytes:
+            return  # never cache something that would evict everything else
+        self._data[key] = (value, size, expires)
+        self._bytes += size
+        while len(self._data) > self.max_items or self._bytes > self.max_bytes:
+            _, (_, evicted, _) = self._data.popitem(last=False)
+            self._bytes -= evicted
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._store(key, value, size, expires)
+        return value
+
+    def replace(self, key, value):
+        """Swap the value at ``key`` keeping its expiry; stores nothing if there is no live entry."""
+        size = self.sizeof(value)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (entry[2] is None or entry[2] > time.monotonic()):
+                self._store(key, value, size, entry[2])
+        return value
+
+    def get_or_create(self, key, factory):
+        value = self.get(key)
+        if value is None:
+            # Built outside the lock: two sessions may race to render, but never block each other
+            value = self.put(key, factory())
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return default
+            self._bytes -= entry[1]
+            return entry[0]
+
+    def discard(self, key):
+        self.pop(key)
+
+    def rekey(self, old, new):
+        """Move the entry at ``old`` to ``new``, keeping its expiry; False if there was no live entry."""
+        with self._lock:
+            entry = self._data.pop(old, None)
+            if entry is None:
+                return False
+            if entry[2] is not None and entry[2] <= time.monotonic():
+                self._bytes -= entry[1]
+                return False
+            replaced = self._data.pop(new, None)
+            if replaced is not None:
+                self._bytes -= replaced[1]
+            self._data[new] = entry
+            return True
+
+    def keys(self):
+        with self._lock:
+            return list(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
@@ -0,0 +1,158 @@
+"""Hot reload of the employee workbook and PIN list.
+
+A daemon thread polls the source files; when one changes it rebuilds the snapshot
+and a new EmployeeStore off the request path, diffs rows by ECODE, and swaps the
+store in with a single reference assignment. Readers that already hold the old
+store keep using it until their next rerun. Subscribers receive the diff so they
+can drop only the per-employee entries that changed.
+
+    python data_watcher.py                    # watch and print diffs
+    python data_watcher.py --publish-shared   # also republish for ASKHR_SHARED_DATA replicas
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+from employee_store import EmployeeStore
+from snapshot import XLSX_PATH, PIN_PATH, load_frames
+
+WATCH_INTERVAL = float(os.environ.get("ASKHR_WATCH_INTERVAL", "5"))
+
+log = logging.getLogger("askhr.data")
+
+DataDiff = namedtuple("DataDiff", ["old_version", "new_version", "added", "removed", "changed"])
+
+
+def _stamp(paths):
+    stamp = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def row_digests(store):
+    """ECODE -> digest of the employee's row(s) and PIN(s)."""
+    df = store.df
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    digests = {}
+    for ecode, positions in store._rows.items():
+        digests[ecode] = (tuple(int(hashes[p]) for p in positions), tuple(store._pins.get(ecode, ())))
+    for ecode, pins in store._pins.items():
+        if ecode not in digests:
+            digests[ecode] = ((), tuple(pins))
+    return digests
+
+
+def diff_stores(old, new, old_digests=None, new_digests=None):
+    old_digests = old_digests if old_digests is not None else row_digests(old)
+    new_digests = new_digests if new_digests is not None else row_digests(new)
+    if list(old.df.columns) != list(new.df.columns) or not old.df.dtypes.equals(new.df.dtypes):
+        # Schema change: every surviving employee's projections may differ
+        changed = set(old_digests) & set(new_digests)
+    else:
+        changed = {e for e in set(old_digests) & set(new_digests) if old_digests[e] != new_digests[e]}
+    return DataDiff(old.version, new.version, set(new_digests) - set(old_digests),
+                    set(old_digests) - set(new_digests), changed)
+
+
+class DataWatcher:
+    """Owns the live EmployeeStore and replaces it when the source files change."""
+
+    def __init__(self, xlsx_path=XLSX_PATH, pin_path=PIN_PATH, interval=WATCH_INTERVAL):
+        self.paths = (xlsx_path, pin_path)
+        self.interval = interval
+        self._subscribers = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._stamp = _stamp(self.paths)
+        self.store, self.pin_df = self._load()
+        self._digests = row_digests(self.store)
+
+    def _load(self):
+        df, pin_df, version = load_frames(*self.paths)
+        return EmployeeStore(df, pin_df, version), pin_df
+
+    def subscribe(self, callback):
+        """``callback(diff)`` runs on the watcher thread right after each swap."""
+        self._subscribers.append(callback)
+
+    def check(self):
+        """Reload if the sources changed; returns the DataDiff of the swap, or None."""
+        stamp = _stamp(self.paths)
+        if stamp == self._stamp or None in stamp:
+            return None  # unchanged, or mid-write (file briefly missing)
+        try:
+            new, pin_df = self._load()
+        except Exception:
+            # Half-written workbook and the like: keep serving the old version, retry next tick
+            log.exception("reload of %s failed; keeping version %s", self.paths, self.store.version)
+            return None
+        self._stamp = stamp
+        if new.version is not None and new.version == self.store.version:
+            return None  # touched, content identical
+        new_digests = row_digests(new)
+        diff = diff_stores(self.store, new, self._digests, new_digests)
+        self.store, self.pin_df, self._digests = new, pin_df, new_digests
+        log.info("data %s -> %s: %d added, %d removed, %d changed", diff.old_version, diff.new_version,
+                 len(diff.added), len(diff.removed), len(diff.changed))
+        for callback in list(self._subscribers):
+            try:
+                callback(diff)
+            except Exception:
+                log.exception("data reload subscriber failed")
+        return diff
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="askhr-data-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch the employee data files and report row-level changes.")
+    parser.add_argument("--xlsx", default=XLSX_PATH)
+    parser.add_argument("--pins", default=PIN_PATH)
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL)
+    parser.add_argument("--publish-shared", action="store_true", help="republish for ASKHR_SHARED_DATA replicas")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    watcher = DataWatcher(args.xlsx, args.pins, args.interval)
+    log.info("watching %s (version %s, %d employees)", watcher.paths, watcher.store.version, len(watcher.store))
+    if args.publish_shared:
+        import shared_data
+
+        def republish(diff=None):
+            pointer = shared_data.publish(watcher.store.df, watcher.pin_df, watcher.store.version)
+            log.info("published %s to %s", pointer["version"], shared_data.SHARED_DIR)
+
+        republish()
+        watcher.subscribe(republish)
+    try:
+        while True:
+            time.sleep(args.interval)
+            watcher.check()
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import hmac
+
+from matcher import EMPLOYEE_VIEWS
+
+
+class EmployeeIndex:
+    """ECODE -> row positions and ECODE -> PINs, with the PIN check.
+
+    Shared by EmployeeStore and the memory-mapped SharedEmployeeStore, which differ
+    only in how rows are stored and sliced.
+    """
+
+    def __init__(self, ecodes, pins):
+        # ``ecodes`` in row order; ``pins`` as (ECODE, PIN) pairs
+        self._rows = {}
+        for pos, ecode in enumerate(ecodes):
+            self._rows.setdefault(str(ecode), []).append(pos)
+        self._pins = {}
+        for ecode, pin in pins:
+            self._pins.setdefault(str(ecode), []).append(str(pin).encode("utf-8"))
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, ecode):
+        return ecode in self._rows
+
+    def authenticate(self, ecode, pin):
+        candidate = str(pin).encode("utf-8")
+        ok = False
+        # Compare against every stored PIN so timing does not reveal which one matched
+        for stored in self._pins.get(str(ecode), ()):
+            ok |= hmac.compare_digest(stored, candidate)
+        return ok
+
+    def ecodes(self):
+        return list(self._rows)
+
+
+class EmployeeStore(EmployeeIndex):
+    """Read-only employee lookups built once per data version.
+
+    ECODE -> row positions is a plain dict, PINs are stringified up front, and the
+    column projections used by the HR-data answers are sliced from the frame once.
+    """
+
+    def __init__(self, df, pin_df, version=None):
+        super().__init__(df["ECODE"].astype(str), zip(pin_df["ECODE"].astype(str), pin_df["PIN"].astype(str)))
+        self.df = df
+        self.version = version
+        self._views = {}
+        for intent, (label, cols) in EMPLOYEE_VIEWS.items():
+            frame = df if cols is None else df[[c for c in cols if c in df.columns]]
+            self._views[intent] = (label, frame)
+
+    def _take(self, frame, ecode):
+        positions = self._rows.get(ecode)
+        if not positions:
+            return frame.iloc[0:0]
+        if len(positions) == 1:
+            # A positional slice is a cheap view; list indexing copies every column
+            return frame.iloc[positions[0]:positions[0] + 1]
+        return frame.iloc[positions]
+
+    def row(self, ecode):
+        """Employee record as a DataFrame (empty when the ECODE is unknown)."""
+        return self._take(self.df, ecode)
+
+    def view(self, ecode, intent):
+        """(label, projected table) for an HR-data intent, using the precomputed column projection."""
+        label, frame = self._views[intent]
+        return label, self._take(frame, ecode)
+
+
+def authenticate(ecode, pin, store):
+    return store.authenticate(ecode, pin)
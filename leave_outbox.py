@@ -0,0 +1,341 @@
+"""Server-side outbox for annual leave requests.
+
+The leave form only inserts a row into a SQLite outbox and returns; a background
+worker claims due rows in batches and delivers them over one SMTP connection per
+batch, retrying with exponential backoff. Each request carries an idempotency key
+(ECODE + dates): resubmitting the same leave returns the existing row instead of
+queueing a second email, and the key is also the Message-ID, so a retry after a
+lost acknowledgement can be de-duplicated by the mail system. The table doubles
+as HR's request log.
+
+    python leave_outbox.py list [--ecode E0006] [--status pending] [--csv]
+    python leave_outbox.py deliver [--once]     # run the delivery worker in the foreground
+    python leave_outbox.py retry 12             # re-queue a failed request
+
+Delivery is configured with ASKHR_SMTP_HOST / _PORT / _USER / _PASSWORD / _STARTTLS
+and ASKHR_LEAVE_FROM / ASKHR_LEAVE_TO. For local testing run a stand-in server
+(`python -m aiosmtpd -n -l localhost:8025`) with ASKHR_SMTP_HOST=localhost
+ASKHR_SMTP_PORT=8025. Without ASKHR_SMTP_HOST the employee sends the email through
+the Outlook links; the request is logged as ``handed_off`` and never claimed by the
+worker, so configuring SMTP later does not email HR a second time.
+"""
+import argparse
+import csv
+import hashlib
+import logging
+import os
+import smtplib
+import sqlite3
+import sys
+import threading
+import time
+from email.message import EmailMessage
+from email.utils import formatdate
+
+import metrics
+
+OUTBOX_PATH = os.environ.get("ASKHR_OUTBOX_DB", "leave_requests.sqlite3")
+LEAVE_TO = os.environ.get("ASKHR_LEAVE_TO", "ali.zein@prologisticslb.com")
+LEAVE_FROM = os.environ.get("ASKHR_LEAVE_FROM", "askhr@prologisticslb.com")
+SMTP_HOST = os.environ.get("ASKHR_SMTP_HOST", "")
+SMTP_PORT = int(os.environ.get("ASKHR_SMTP_PORT", "25"))
+SMTP_USER = os.environ.get("ASKHR_SMTP_USER", "")
+SMTP_PASSWORD = os.environ.get("ASKHR_SMTP_PASSWORD", "")
+SMTP_STARTTLS = os.environ.get("ASKHR_SMTP_STARTTLS", "").lower() in ("1", "true", "yes")
+
+BATCH_SIZE = 20
+MAX_ATTEMPTS = 6
+RETRY_BASE = 30  # seconds; doubles per attempt
+LEASE = 300  # a claimed row is re-queued if its worker died before finishing it
+
+log = logging.getLogger("askhr.outbox")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leave_requests (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    ecode TEXT NOT NULL,
+    name TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending | sending | sent | failed | handed_off
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS leave_requests_due ON leave_requests (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS leave_requests_ecode ON leave_requests (ecode, created_at);
+"""
+
+COLUMNS = ("id", "ecode", "name", "start_date", "end_date", "status", "attempts", "created_at", "sent_at",
+           "last_error")
+
+
+# ===== Storage =====
+def connect(path=OUTBOX_PATH):
+    conn = sqlite3.connect(path, timeout=10, isolation_level=None)  # autocommit; explicit BEGIN where needed
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")  # the form's insert never waits on the worker's reads
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def compose(ecode, name, start_date, end_date):
+    """(subject, body) of the leave email, worded as the Outlook compose links always were."""
+    body = f"""Dear Mr Ali,
+
+I am {ecode} and my name is {name}. I am requesting an annual leave from {start_date} to {end_date}.
+
+Kind regards,
+{name}
+"""
+    return "Annual Leave Request", body
+
+
+def idempotency_key(ecode, start_date, end_date):
+    return hashlib.sha256(f"{ecode}|{start_date}|{end_date}".encode("utf-8")).hexdigest()[:32]
+
+
+def enqueue(conn, ecode, name, start_date, end_date, recipient=LEAVE_TO, deliver=True):
+    """Record a leave request; returns (row, created). A repeat of the same request returns the original row.
+
+    With ``deliver=False`` the email is sent by the employee (Outlook links) and the row
+    is only logged, as ``handed_off``. Resubmitting a request that ``failed`` re-queues it.
+    """
+    key = idempotency_key(ecode, start_date, end_date)
+    subject, body = compose(ecode, name, start_date, end_date)
+    now = time.time()
+    cur = conn.execute(
+        "INSERT OR IGNORE INTO leave_requests (idempotency_key, ecode, name, start_date, end_date, recipient,"
+        " subject, body, status, created_at, next_attempt_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (key, ecode, name, str(start_date), str(end_date), recipient, subject, body,
+         "pending" if deliver else "handed_off", now, now))
+    created = cur.rowcount == 1
+    if not created and deliver:
+        requeue(conn, key=key, statuses=("failed",))
+    row = conn.execute("SELECT * FROM leave_requests WHERE idempotency_key = ?", (key,)).fetchone()
+    metrics.count("askhr_leave_requests_total",
+                  outcome="duplicate" if not created else "queued" if deliver else "handed_off")
+    return row, created
+
+
+def claim(conn, limit=BATCH_SIZE, now=None):
+    """Mark up to ``limit`` due requests as being sent by this worker and return them."""
+    now = time.time() if now is None else now
+    conn.execute("BEGIN IMMEDIATE")  # one claimer at a time across processes
+    try:
+        rows = conn.execute(
+            "SELECT * FROM leave_requests WHERE (status = 'pending' AND next_attempt_at <= ?)"
+            " OR (status = 'sending' AND next_attempt_at <= ?) ORDER BY id LIMIT ?",
+            (now, now, limit)).fetchall()
+        conn.executemany("UPDATE leave_requests SET status = 'sending', next_attempt_at = ? WHERE id = ?",
+                         [(now + LEASE, row["id"]) for row in rows])
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return rows
+
+
+def mark_sent(conn, row_id):
+    conn.execute("UPDATE leave_requests SET status = 'sent', sent_at = ?, attempts = attempts + 1, last_error = NULL"
+                 " WHERE id = ?", (time.time(), row_id))
+
+
+def mark_failed(conn, row, error, count_attempt=True):
+    """Schedule a retry with backoff. An unreachable server (``count_attempt=False``) never uses up attempts."""
+    attempts = row["attempts"] + 1 if count_attempt else row["attempts"]
+    status = "failed" if attempts >= MAX_ATTEMPTS else "pending"
+    conn.execute("UPDATE leave_requests SET status = ?, attempts = ?, last_error = ?, next_attempt_at = ? WHERE id = ?",
+                 (status, attempts, str(error)[:500], time.time() + RETRY_BASE * 2 ** max(attempts - 1, 0),
+                  row["id"]))
+    return status
+
+
+def requeue(conn, row_id=None, key=None, statuses=("failed", "pending")):
+    """Make a request due again with a fresh attempt budget; by id, or by idempotency key."""
+    column, value = ("id", row_id) if key is None else ("idempotency_key", key)
+    cur = conn.execute(f"UPDATE leave_requests SET status = 'pending', attempts = 0, next_attempt_at = ?"
+                       f" WHERE {column} = ? AND status IN ({', '.join('?' * len(statuses))})",
+                       (time.time(), value, *statuses))
+    return cur.rowcount == 1
+
+
+def query(conn, ecode=None, status=None, since=None, limit=None):
+    """HR request log, newest first."""
+    clauses, params = [], []
+    for column, op, value in (("ecode", "=", ecode), ("status", "=", status), ("created_at", ">=", since)):
+        if value is not None:
+            clauses.append(f"{column} {op} ?")
+            params.append(value)
+    sql = "SELECT * FROM leave_requests"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY id DESC"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return conn.execute(sql, params).fetchall()
+
+
+# ===== Delivery =====
+def build_message(row, sender=LEAVE_FROM):
+    msg = EmailMessage()
+    msg["From"] = sender
+    msg["To"] = row["recipient"]
+    msg["Subject"] = row["subject"]
+    msg["Date"] = formatdate(row["created_at"], localtime=True)
+    msg["Message-ID"] = f"<leave-{row['idempotency_key']}@askhr>"
+    msg["X-AskHR-Idempotency-Key"] = row["idempotency_key"]
+    msg.set_content(row["body"])
+    return msg
+
+
+def smtp_factory(host=SMTP_HOST, port=SMTP_PORT, user=SMTP_USER, password=SMTP_PASSWORD, starttls=SMTP_STARTTLS):
+    def connect_smtp():
+        smtp = smtplib.SMTP(host, port, timeout=30)
+        if starttls:
+            smtp.starttls()
+        if user:
+            smtp.login(user, password)
+        return smtp
+    return connect_smtp
+
+
+def deliver_batch(conn, connect_smtp, limit=BATCH_SIZE):
+    """Send one batch of due requests over a single SMTP session; returns (sent, failed) counts."""
+    rows = claim(conn, limit)
+    if not rows:
+        return 0, 0
+    sent = failed = 0
+    try:
+        smtp = connect_smtp()
+    except (OSError, smtplib.SMTPException) as exc:
+        for row in rows:
+            mark_failed(conn, row, exc, count_attempt=False)
+        metrics.count("askhr_leave_delivery_total", len(rows), outcome="smtp_unavailable")
+        log.warning("SMTP unavailable, %d leave requests re-queued: %s", len(rows), exc)
+        return 0, len(rows)
+    with smtp:
+        for row in rows:
+            try:
+                with metrics.timed("leave_smtp_send"):
+                    smtp.send_message(build_message(row))
+            except (OSError, smtplib.SMTPException) as exc:
+                status = mark_failed(conn, row, exc)
+                metrics.count("askhr_leave_delivery_total", outcome=status)
+                log.warning("leave request %s not delivered (%s): %s", row["id"], status, exc)
+                failed += 1
+            else:
+                mark_sent(conn, row["id"])
+                metrics.count("askhr_leave_delivery_total", outcome="sent")
+                sent += 1
+    return sent, failed
+
+
+class OutboxWorker:
+    """Daemon thread draining the outbox; ``notify()`` wakes it right after an enqueue."""
+
+    def __init__(self, path=OUTBOX_PATH, connect_smtp=None, interval=15):
+        self.path = path
+        self.connect_smtp = connect_smtp or smtp_factory()
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def notify(self):
+        self._wake.set()
+
+    def drain(self, conn):
+        total = 0
+        while True:
+            sent, failed = deliver_batch(conn, self.connect_smtp)
+            total += sent
+            if sent + failed < BATCH_SIZE or failed:
+                return total  # queue empty, or the server is struggling: back off until the next tick
+
+    def _run(self):
+        conn = connect(self.path)
+        while not self._stop.is_set():
+            try:
+                self.drain(conn)
+            except Exception:
+                log.exception("leave outbox delivery failed")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="askhr-leave-outbox", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+
+# ===== CLI =====
+def _format_time(ts):
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(ts)) if ts else ""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and deliver the leave request outbox.")
+    parser.add_argument("--db", default=OUTBOX_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("list", help="print the request log")
+    show.add_argument("--ecode")
+    show.add_argument("--status", choices=["pending", "sending", "sent", "failed", "handed_off"])
+    show.add_argument("--days", type=float, help="only requests from the last N days")
+    show.add_argument("--limit", type=int)
+    show.add_argument("--csv", action="store_true")
+    deliver = sub.add_parser("deliver", help="run the delivery worker in the foreground")
+    deliver.add_argument("--once", action="store_true", help="drain what is due and exit")
+    retry = sub.add_parser("retry", help="re-queue a failed request")
+    retry.add_argument("id", type=int)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    conn = connect(args.db)
+    if args.command == "list":
+        since = time.time() - args.days * 86400 if args.days else None
+        rows = query(conn, args.ecode, args.status, since, args.limit)
+        if args.csv:
+            writer = csv.writer(sys.stdout)
+            writer.writerow(COLUMNS)
+            writer.writerows([row[c] for c in COLUMNS] for row in rows)
+            return 0
+        for row in rows:
+            print(f"{row['id']:5d}  {row['ecode']:8} {row['start_date']} → {row['end_date']}  {row['status']:8}"
+                  f" {_format_time(row['created_at'])}  {row['name']}"
+                  + (f"  [{row['last_error']}]" if row["status"] != "sent" and row["last_error"] else ""))
+        return 0
+    if args.command == "retry":
+        if not requeue(conn, args.id):
+            print(f"request {args.id} is not failed or pending", file=sys.stderr)
+            return 1
+        return 0
+
+    if not SMTP_HOST:
+        print("ASKHR_SMTP_HOST is not set", file=sys.stderr)
+        return 1
+    worker = OutboxWorker(args.db)
+    if args.once:
+        print(f"delivered {worker.drain(conn)} requests")
+        return 0
+    worker.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+"""Concurrent-session load test for the Streamlit app.
+
+Each simulated employee is a ``streamlit.testing`` AppTest session driven from its own
+thread in this process, so sessions share the app's process-wide caches, background
+threads and GIL exactly as browser sessions of one server instance do (the websocket
+and browser side are not simulated). A user logs in with a real ECODE/PIN, then asks
+a mix of policy questions, HR-data questions (some with typos), profile requests that
+produce the PDF download, and "show all policy" requests that produce every section PDF.
+
+For each concurrency level it reports throughput, p50/p95/p99 rerun latency per kind
+of question and the process RSS; with metrics on, it breaks reruns down by stage,
+shows how often each stage runs per rerun and how much slower it got than at the
+first level, and flags PDFs written to the working directory by sessions.
+
+    python loadtest.py --users 1,5,10,20 --questions 20
+    python loadtest.py --users 8 --duration 60 --think 0.5 --json load.json
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+
+import streamlit
+from streamlit.runtime import Runtime
+from streamlit.testing.v1 import AppTest
+
+import metrics
+from bench import FREE_TEXT, percentile
+from matcher import load_triggers
+from snapshot import XLSX_PATH, PIN_PATH, load_frames
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+KIND_WEIGHTS = {"policy": 0.30, "employee": 0.30, "profile_pdf": 0.10, "all_policy_pdfs": 0.05, "typo": 0.10,
+                "miss": 0.15}
+STREAMLIT_TESTED = "1.66"  # share_app_test_runtime patches internals as of this release
+
+
+# ===== Workload =====
+def question_pool(triggers):
+    """kind -> candidate questions, built from the live trigger lists."""
+    policy = [kw for kws in triggers["policy_sections"].values() for kw in kws]
+    employee = [kw for intent, kws in triggers["employee"].items() if intent != "profile" for kw in kws]
+    typos = []
+    for kw in policy + employee:
+        if kw.isascii() and len(kw) >= 6:
+            i = len(kw) // 2
+            typos.append(kw[:i] + kw[i + 1] + kw[i] + kw[i + 2:])  # swap two adjacent letters
+    return {
+        "policy": [f"tell me about {kw}" if kw.isascii() else kw for kw in policy],
+        "employee": [f"what is my {kw}" if kw.isascii() else kw for kw in employee],
+        "profile_pdf": ["show my profile", "download my profile", "ملفي", "تفاصيل ملفي"],
+        "all_policy_pdfs": list(triggers["policy_all"]["any"]),
+        "typo": typos,
+        "miss": FREE_TEXT,
+    }
+
+
+def credentials(xlsx_path=XLSX_PATH, pin_path=PIN_PATH):
+    df, pin_df, _ = load_frames(xlsx_path, pin_path)
+    known = set(df["ECODE"].astype(str))
+    return [(e, p) for e, p in zip(pin_df["ECODE"].astype(str), pin_df["PIN"].astype(str)) if e in known]
+
+
+# ===== Sessions =====
+def share_app_test_runtime():
+    """Let concurrent AppTests behave like sessions of one server.
+
+    AppTest installs a fresh mock Runtime as the process-global instance around every
+    run (clearing it afterwards) and compiles the script with a private ScriptCache, so
+    parallel sessions clear each other's runtime and race in the compiler. Here the
+    first runtime installed is kept for everyone (one media file manager, as on a
+    server) and all sessions share one ScriptCache, which compiles under its own lock.
+    These are private Streamlit internals, so a release that moves them fails here loudly.
+    """
+    try:
+        from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+        from streamlit.testing.v1 import app_test, local_script_runner
+    except ImportError as e:
+        raise SystemExit(f"streamlit {streamlit.__version__} is not supported by loadtest.py "
+                         f"(written against {STREAMLIT_TESTED}): {e}")
+    missing = [name for obj, attr, name in [
+        (Runtime, "instance", "Runtime.instance"), (Runtime, "_instance", "Runtime._instance"),
+        (app_test, "ScriptCache", "app_test.ScriptCache"),
+        (local_script_runner, "ScriptCache", "local_script_runner.ScriptCache")] if not hasattr(obj, attr)]
+    if missing:
+        raise SystemExit(f"streamlit {streamlit.__version__} is not supported by loadtest.py "
+                         f"(written against {STREAMLIT_TESTED}): missing {', '.join(missing)}")
+    shared = {}
+
+    def instance(cls):
+        if "runtime" not in shared and cls._instance is not None:
+            shared["runtime"] = cls._instance
+        if "runtime" not in shared:
+            raise RuntimeError("Runtime hasn't been created!")
+        return shared["runtime"]
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: "runtime" in shared or cls._instance is not None)
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = []  # (kind, seconds)
+        self.errors = []
+        self.downloads = 0
+        self._lock = threading.Lock()
+
+    def add(self, kind, seconds, downloads=0):
+        with self._lock:
+            self.samples.append((kind, seconds))
+            self.downloads += downloads
+
+    def error(self, message):
+        with self._lock:
+            self.errors.append(message)
+
+
+def simulate_user(ecode, pin, pool, recorder, rng, questions, deadline, think, timeout):
+    try:
+        at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        t0 = time.perf_counter()
+        at.run()
+        at.text_input[0].input(ecode)
+        at.text_input[1].input(pin)
+        at.button[0].click().run()
+        recorder.add("login", time.perf_counter() - t0)
+        if at.exception or not at.session_state["authenticated"]:
+            recorder.error(f"{ecode}: login failed")
+            return
+        kinds, weights = list(KIND_WEIGHTS), list(KIND_WEIGHTS.values())
+        asked = 0
+        while asked < questions and time.monotonic() < deadline:
+            kind = rng.choices(kinds, weights)[0]
+            box = next(t for t in at.text_input if "Ask" in t.label)
+            t0 = time.perf_counter()
+            box.input(rng.choice(pool[kind])).run()
+            elapsed = time.perf_counter() - t0
+            if at.exception:
+                recorder.error(f"{ecode}: {at.exception[0].message}")
+                return
+            recorder.add(kind, elapsed, len(at.get("download_button")))
+            asked += 1
+            if think:
+                time.sleep(rng.uniform(0, 2 * think))
+    except Exception as exc:  # a broken session must not take the whole run down
+        recorder.error(f"{ecode}: {exc!r}")
+
+
+# ===== Measurement =====
+def rss_kb():
+    with open("/proc/self/status", "r", encoding="ascii") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class RSSSampler(threading.Thread):
+    def __init__(self, interval=0.25):
+        super().__init__(name="askhr-rss-sampler", daemon=True)
+        self.interval = interval
+        self.peak_kb = self.start_kb = rss_kb()
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.wait(self.interval):
+            self.peak_kb = max(self.peak_kb, rss_kb())
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+        self.end_kb = rss_kb()
+
+
+def latency_stats(values):
+    values = sorted(values)
+    return {"n": len(values), "p50_ms": percentile(values, 0.50) * 1000, "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000, "max_ms": (values[-1] if values else 0.0) * 1000}
+
+
+def stray_pdfs():
+    return set(glob.glob("section_*.pdf")) | set(glob.glob("employee_data_*.pdf"))
+
+
+def run_level(users, creds, pool, args, seed):
+    metrics.reset()
+    caches_before = metrics.snapshot()["caches"]
+    pdfs_before = stray_pdfs()
+    recorder = Recorder()
+    sampler = RSSSampler()
+    sampler.start()
+    deadline = time.monotonic() + args.duration if args.duration else float("inf")
+    questions = args.questions if not args.duration else sys.maxsize
+    threads = []
+    start = time.perf_counter()
+    for i in range(users):
+        ecode, pin = creds[i % len(creds)]
+        t = threading.Thread(target=simulate_user, name=f"user-{i}",
+                             args=(ecode, pin, pool, recorder, random.Random(seed + i), questions, deadline,
+                                   args.think, args.timeout))
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    sampler.stop()
+
+    reruns = [s for k, s in recorder.samples if k != "login"]
+    by_kind = {}
+    for kind, seconds in recorder.samples:
+        by_kind.setdefault(kind, []).append(seconds)
+    snap = metrics.snapshot()
+    caches = {}
+    for name, c in snap["caches"].items():
+        before = caches_before.get(name, {"hits": 0, "misses": 0})
+        hits, misses = c["hits"] - before["hits"], c["misses"] - before["misses"]
+        caches[name] = {"hits": hits, "misses": misses, "hit_ratio": hits / (hits + misses) if hits + misses else 0.0}
+    return {
+        "users": users,
+        "wall_s": wall,
+        "questions": len(reruns),
+        "throughput_rps": len(reruns) / wall if wall else 0.0,
+        "latency": latency_stats(reruns),
+        "by_kind": {kind: latency_stats(v) for kind, v in sorted(by_kind.items())},
+        "downloads_served": recorder.downloads,
+        "errors": recorder.errors,
+        "rss_kb": {"start": sampler.start_kb, "peak": sampler.peak_kb, "end": sampler.end_kb},
+        "stages": snap["stages"],
+        "caches": caches,
+        "stray_pdfs": sorted(stray_pdfs() - pdfs_before),
+        "rerun_s_total": sum(s for _, s in recorder.samples),
+        "reruns": len(recorder.samples),
+    }
+
+
+# ===== Reporting =====
+def print_level(r):
+    lat = r["latency"]
+    rss = r["rss_kb"]
+    print(f"\n== {r['users']} users: {r['questions']} questions in {r['wall_s']:.1f}s "
+          f"({r['throughput_rps']:.1f}/s)  p50 {lat['p50_ms']:.0f} ms  p95 {lat['p95_ms']:.0f} ms  "
+          f"p99 {lat['p99_ms']:.0f} ms  RSS {rss['start'] / 1024:.0f}→{rss['peak'] / 1024:.0f} MiB peak")
+    print(f"{'kind':18} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for kind, s in r["by_kind"].items():
+        print(f"{kind:18} {s['n']:6d} {s['p50_ms']:9.1f} {s['p95_ms']:9.1f} {s['p99_ms']:9.1f} {s['max_ms']:9.1f}")
+    print(f"PDF download buttons served: {r['downloads_served']}")
+    if r["errors"]:
+        print(f"{len(r['errors'])} session errors, first: {r['errors'][0]}")
+
+
+def print_contention(results):
+    """Per-stage work per rerun at the last level, and its slowdown against the first level."""
+    base, last = results[0], results[-1]
+    if not last["stages"]:
+        return
+    reruns = max(last["reruns"], 1)
+    print(f"\nstage breakdown at {last['users']} users (slowdown vs {base['users']} users):")
+    print(f"{'stage':22} {'per rerun':>10} {'mean ms':>9} {'share':>7} {'slowdown':>9}")
+    stage_total = 0.0
+    for stage, s in sorted(last["stages"].items(), key=lambda kv: -kv[1]["sum_s"]):
+        stage_total += s["top_level_s"]  # stages nest (rerun_setup wraps load_data, ...): count each second once
+        b = base["stages"].get(stage)
+        slowdown = f"{s['mean_ms'] / b['mean_ms']:8.1f}x" if b and b["mean_ms"] and base is not last else f"{'—':>9}"
+        print(f"{stage:22} {s['count'] / reruns:10.2f} {s['mean_ms']:9.2f} "
+              f"{s['sum_s'] / last['rerun_s_total']:7.1%} {slowdown}")
+    # Time inside AppTest.run() not attributed to an instrumented stage: script execution, widget
+    # serialisation, media registration of download bytes and waiting on the GIL
+    other = last["rerun_s_total"] - stage_total
+    print(f"{'(uninstrumented)':22} {'':>10} {other / reruns * 1000:9.2f} {other / last['rerun_s_total']:7.1%}")
+    for name, c in sorted(last["caches"].items()):
+        print(f"cache {name:16} hit ratio {c['hit_ratio']:.1%} ({c['hits']} hits, {c['misses']} misses)")
+    if last["stray_pdfs"]:
+        print(f"sessions wrote {len(last['stray_pdfs'])} PDFs to the working directory "
+              f"(shared files race across sessions): {', '.join(last['stray_pdfs'][:5])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the Ask HR app.")
+    parser.add_argument("--users", default="1,5,10", help="comma-separated concurrency levels")
+    parser.add_argument("--questions", type=int, default=20, help="questions per user (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="seconds per level instead of a fixed question count")
+    parser.add_argument("--think", type=float, default=0.0, help="mean think time between questions (seconds)")
+    parser.add_argument("--timeout", type=float, default=120, help="per-rerun timeout (seconds)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-metrics", action="store_true", help="skip the stage breakdown (no timing overhead)")
+    parser.add_argument("--json", metavar="PATH", help="write the full results as JSON")
+    args = parser.parse_args(argv)
+
+    metrics.enable(not args.no_metrics)
+    share_app_test_runtime()
+    levels = [int(u) for u in args.users.split(",")]
+    pool = question_pool(load_triggers())
+    creds = credentials()
+    print(f"{len(creds)} employees with PINs; levels {levels}", file=sys.stderr)
+
+    # Warm the process-wide caches once so the first level does not pay the cold start alone
+    simulate_user(*creds[0], pool, Recorder(), random.Random(args.seed), 1, float("inf"), 0, args.timeout)
+
+    results = []
+    for users in levels:
+        results.append(run_level(users, creds, pool, args, args.seed))
+        print_level(results[-1])
+    print_contention(results)
+    print(f"\nmax RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"app": APP_PATH, "levels": results}, f, indent=2)
+    return 1 if any(r["errors"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
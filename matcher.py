@@ -0,0 +1,340 @@
+import json
+import math
+import os
+import re
+from collections import deque, namedtuple
+from functools import lru_cache
+
+from metrics import count, timed_fn
+from policy_index import normalize_arabic
+
+TRIGGERS_PATH = "intent_triggers.json"
+
+# Stages in the order they are resolved; a hit in an earlier stage always wins.
+STAGES = ("hr_team", "policy_special", "policy_all", "policy_sections", "employee")
+
+# HR-data intents -> (answer label, projected columns; None means the full row)
+EMPLOYEE_VIEWS = {
+    "profile": ("📋 Full Employee Info", None),
+    "salary": ("💰 Salary Breakdown", [
+        "Payment Method", "TRANSPORT", "BONUS", "COMM", "OVERTIME", "ABSENCE", "Loan", "TRN-DD",
+        "InSurance", "FAM ALL", "NSSF 3%", "INCOMETAX", "Total Ded", "Total USD", "Total"]),
+    "joining": ("📅 Joining Date", ["JOINING DATE"]),
+    "leave": ("🌴 Annual Leaves", ["ANNUAL LEAVES"]),
+    "nssf": ("🧾 Social Security Number", ["SOCIAL SECURITY NUMBER"]),
+}
+
+Rule = namedtuple("Rule", ["stage", "intent", "clauses"])
+
+# Typo tolerance, overridable by the "fuzzy" block of intent_triggers.json:
+#   min_length     - shorter keywords never match with edits (only exactly, after folding)
+#   max_edits      - hard cap on the edit distance of a fuzzy hit
+#   min_similarity - 1 - edits / keyword length must reach this
+#   min_overlap    - share of the keyword's trigrams a query window needs to be verified at all
+#   strict_length  - shorter keywords only forgive a dropped, doubled or swapped letter or a vowel slip;
+#                    a consonant change there usually spells another word (resort/report, joiner/joined)
+# Whatever the length, the first letter has to be right ("inclusion" is not "conclusion").
+FUZZY_DEFAULTS = {"enabled": True, "min_length": 6, "max_edits": 2, "min_similarity": 0.8, "min_overlap": 0.4,
+                  "strict_length": 8}
+
+
+def normalize_query(text):
+    # Case, diacritics and hamza/ta-marbuta variants fold alike, so "الاساءة" still contains "إساءة"
+    return normalize_arabic(text.lower()).strip()
+
+
+# ===== Aho-Corasick automaton =====
+class Automaton:
+    """Multi-pattern substring matcher: one pass over the text finds every pattern it contains."""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for pid, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            self._out[state] += (pid,)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def scan(self, text):
+        goto, fail, out = self._goto, self._fail, self._out
+        hits = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                hits.update(out[state])
+        return hits
+
+
+# ===== Fuzzy fallback =====
+_WORD = re.compile(r"\w+")
+
+
+def fold(text):
+    """Case, diacritic and hamza/ta-marbuta folding; words joined by single spaces."""
+    return " ".join(_WORD.findall(normalize_arabic(text.lower())))
+
+
+def trigrams(text):
+    padded = f" {text}"
+    return {padded[i:i + 3] for i in range(max(1, len(padded) - 2))}
+
+
+_VOWELS = frozenset("aeiouاوي")
+
+
+def is_slip(keyword, text):
+    """True when ``text`` is ``keyword`` with one letter dropped, doubled or swapped, or one vowel changed."""
+    if len(keyword) != len(text):
+        longer, shorter = (keyword, text) if len(keyword) > len(text) else (text, keyword)
+        return len(longer) - len(shorter) == 1 and any(
+            longer[:i] + longer[i + 1:] == shorter for i in range(len(longer)))
+    diff = [i for i, (a, b) in enumerate(zip(keyword, text)) if a != b]
+    if len(diff) == 1:
+        return keyword[diff[0]] in _VOWELS and text[diff[0]] in _VOWELS
+    return (len(diff) == 2 and diff[1] == diff[0] + 1
+            and keyword[diff[0]] == text[diff[1]] and keyword[diff[1]] == text[diff[0]])
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance between ``a`` and ``b``; ``limit + 1`` as soon as it must exceed ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1] if prev[-1] <= limit else limit + 1
+
+
+class FuzzyIndex:
+    """Trigram index over folded trigger keywords; candidates are verified by bounded edit distance.
+
+    A keyword of k words is compared with every run of k whole words of the query, so
+    a typo never matches a longer word that merely starts alike ("familiar" is not
+    "family"). Keywords too short for an edit are left to the (folded) exact matcher.
+    """
+
+    def __init__(self, patterns, min_length=6, max_edits=2, min_similarity=0.8, min_overlap=0.4,
+                 strict_length=8):
+        self.min_length = min_length
+        self.max_edits = max_edits
+        self.min_similarity = min_similarity
+        self.min_overlap = min_overlap
+        self.strict_length = strict_length
+        self._keywords = []  # (pattern id, folded keyword, word count, allowed edits, required shared trigrams)
+        self._postings = {}  # trigram -> keyword indices
+        self._max_words = 1
+        self._max_chars = 0
+        for pid, pattern in enumerate(patterns):
+            folded = fold(pattern)
+            if len(folded) < min_length:
+                continue
+            edits = min(max_edits, int(len(folded) * (1 - min_similarity) + 1e-9))
+            if not edits:
+                continue
+            grams = trigrams(folded)
+            # q-gram lemma: each edit destroys at most 3 trigrams, so fewer shared ones cannot verify
+            needed = max(1, math.ceil(min_overlap * len(grams)), len(grams) - 3 * edits)
+            words = folded.count(" ") + 1
+            idx = len(self._keywords)
+            self._keywords.append((pid, folded, words, edits, needed))
+            self._max_words = max(self._max_words, words)
+            self._max_chars = max(self._max_chars, len(folded) + edits)
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(idx)
+
+    def scan(self, text):
+        """Pattern ids whose keyword is within its edit budget of some run of whole words of ``text``."""
+        tokens = fold(text).split()
+        postings = self._postings
+        hits = set()
+        for start in range(len(tokens)):
+            # Candidates come from the longest window starting here: it holds every shorter one, so the
+            # trigram count is an upper bound for each of them and the filter never drops a real match
+            window = " ".join(tokens[start:start + self._max_words])[:self._max_chars]
+            shared = {}
+            for gram in trigrams(window):
+                for idx in postings.get(gram, ()):
+                    shared[idx] = shared.get(idx, 0) + 1
+            for idx, n in shared.items():
+                pid, keyword, words, edits, needed = self._keywords[idx]
+                if n < needed or pid in hits or start + words > len(tokens):
+                    continue
+                candidate = " ".join(tokens[start:start + words])
+                if candidate[0] != keyword[0]:
+                    continue
+                if len(keyword) < self.strict_length:
+                    matched = is_slip(keyword, candidate)
+                else:
+                    matched = edit_distance(keyword, candidate, edits) <= edits
+                if matched:
+                    hits.add(pid)
+        return hits
+
+
+# ===== Intent matcher =====
+class IntentMatcher:
+    """All trigger rules compiled into one automaton; rules are resolved in priority order."""
+
+    def __init__(self, rules, fuzzy=None):
+        self.rules = list(rules)
+        pattern_ids = {}
+        compiled = []
+        for rule in self.rules:
+            clauses = []
+            for clause in rule.clauses:
+                ids = set()
+                for kw in clause:
+                    kw = normalize_query(kw)
+                    if kw:
+                        ids.add(pattern_ids.setdefault(kw, len(pattern_ids)))
+                clauses.append(frozenset(ids))
+            compiled.append(tuple(clauses))
+        self._clauses = compiled
+        self.automaton = Automaton(pattern_ids)
+        options = dict(FUZZY_DEFAULTS, **(fuzzy or {}))
+        self.fuzzy = FuzzyIndex(pattern_ids, **options) if options.pop("enabled") else None
+        # The app asks stage by stage (team, policy, employee), so a miss would otherwise be scanned three times
+        self._fuzzy_hits = lru_cache(maxsize=1024)(self.fuzzy_scan)
+        # pattern id -> indices of the rules whose first clause it can satisfy
+        self._candidates = {}
+        for idx, clauses in enumerate(compiled):
+            for pid in clauses[0] if clauses else ():
+                self._candidates.setdefault(pid, []).append(idx)
+
+    @classmethod
+    def from_triggers(cls, triggers):
+        rules = []
+        for stage in STAGES:
+            spec = triggers.get(stage)
+            if not spec:
+                continue
+            if stage == "hr_team":
+                rules.append(Rule(stage, "HR_TEAM", (tuple(spec),)))
+            elif stage == "policy_special":
+                for entry in spec:
+                    clauses = entry.get("all") or [entry.get("any", [])]
+                    rules.append(Rule(stage, entry["intent"], tuple(tuple(c) for c in clauses)))
+            elif stage == "policy_all":
+                rules.append(Rule(stage, spec["intent"], (tuple(spec["any"]),)))
+            else:
+                for intent, keywords in spec.items():
+                    rules.append(Rule(stage, intent, (tuple(keywords),)))
+        return cls(rules, triggers.get("fuzzy"))
+
+    def _resolve(self, hits, stages):
+        candidates = sorted({idx for pid in hits for idx in self._candidates.get(pid, ())})
+        for idx in candidates:
+            rule = self.rules[idx]
+            if stages is not None and rule.stage not in stages:
+                continue
+            if all(clause & hits for clause in self._clauses[idx]):
+                return rule
+        return None
+
+    @timed_fn("intent_match")
+    def match(self, query, stages=None):
+        """Return the highest-priority Rule hit by ``query`` (restricted to ``stages``), or None.
+
+        The fuzzy layer is consulted only when no rule of any stage matches exactly, and
+        its winner is picked across all stages, so callers asking stage by stage agree.
+        """
+        query = normalize_query(query)
+        hits = self.automaton.scan(query)
+        rule = self._resolve(hits, stages)
+        if rule is not None or self.fuzzy is None:
+            return rule
+        if stages is not None and self._resolve(hits, None) is not None:
+            return None
+        rule = self._resolve(hits | self._fuzzy_hits(query), None)
+        if rule is None or (stages is not None and rule.stage not in stages):
+            return None
+        count("askhr_fuzzy_matches_total", stage=rule.stage)
+        return rule
+
+    @timed_fn("fuzzy_match")
+    def fuzzy_scan(self, query):
+        return frozenset(self.fuzzy.scan(query))
+
+
+def load_triggers(path=TRIGGERS_PATH):
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+@lru_cache(maxsize=4)
+def _compile(path, mtime):
+    return IntentMatcher.from_triggers(load_triggers(path))
+
+
+def get_matcher(path=TRIGGERS_PATH):
+    # Recompiled only when the trigger file changes on disk
+    return _compile(path, os.path.getmtime(path))
+
+
+# ===== Public matchers =====
+POLICY_STAGES = ("policy_special", "policy_all", "policy_sections")
+
+
+def match_policy_section(query, sections, matcher=None):
+    rule = (matcher or get_matcher()).match(query, POLICY_STAGES)
+    if rule is None:
+        return None, "❌ No relevant section found."
+    if rule.stage == "policy_all":
+        return rule.intent, ""
+    if rule.stage == "policy_special":
+        return rule.intent, sections.get(rule.intent, "")
+    return rule.intent, sections.get(rule.intent, "Section content not found.")
+
+
+def project_employee_view(intent, emp_data):
+    label, cols = EMPLOYEE_VIEWS[intent]
+    if cols is None:
+        return label, emp_data
+    return label, emp_data[[c for c in cols if c in emp_data.columns]]
+
+
+def match_employee_intent(question, matcher=None):
+    rule = (matcher or get_matcher()).match(question, ("employee",))
+    if rule is None or rule.intent not in EMPLOYEE_VIEWS:
+        return None
+    return rule.intent
+
+
+def match_employee_question(question, emp_data, matcher=None):
+    intent = match_employee_intent(question, matcher)
+    if intent is None:
+        return None, None
+    return project_employee_view(intent, emp_data)
+
+
+def is_hr_team_question(query, matcher=None):
+    return (matcher or get_matcher()).match(query, ("hr_team",)) is not None
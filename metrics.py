@@ -0,0 +1,213 @@
+"""Lightweight per-stage timings, counters and cache stats.
+
+Off unless ASKHR_METRICS=1 (or ``enable()``); when off, ``timed`` is a shared no-op
+context manager and ``count`` returns immediately. When on, every stage timing is
+also logged as a JSON line on the ``askhr.metrics`` logger (DEBUG), and the totals
+are available as Prometheus text via ``render_prometheus()``, ``write_prometheus(path)``
+or the HTTP endpoint from ``start_http_server(port)`` (ASKHR_METRICS_PORT in the app).
+"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from caching import atomic_write
+
+ENABLED = os.environ.get("ASKHR_METRICS", "").lower() in ("1", "true", "yes")
+BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+log = logging.getLogger("askhr.metrics")
+_lock = threading.Lock()
+_histograms = {}  # stage -> [bucket counts..., +Inf count, sum]
+_counters = {}  # (name, sorted label items) -> value
+_caches = {}  # name -> object with .hits/.misses (caching.LRUCache)
+_top_level = {}  # stage -> seconds spent while no other stage was open on the thread
+_local = threading.local()  # .depth: stages currently open on this thread
+_NOOP = nullcontext()
+
+
+def enable(flag=True):
+    global ENABLED
+    ENABLED = flag
+
+
+def observe(stage, seconds, top_level=True):
+    """Record one run of ``stage``; ``top_level`` is False when it ran inside another timed stage."""
+    with _lock:
+        h = _histograms.get(stage)
+        if h is None:
+            h = _histograms[stage] = [0] * (len(BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                h[i] += 1
+        h[len(BUCKETS)] += 1
+        h[-1] += seconds
+        if top_level:
+            _top_level[stage] = _top_level.get(stage, 0.0) + seconds
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug(json.dumps({"event": "stage", "stage": stage, "ms": round(seconds * 1000, 3)}))
+
+
+def _enter():
+    depth = getattr(_local, "depth", 0)
+    _local.depth = depth + 1
+    return depth == 0
+
+
+def _exit():
+    _local.depth -= 1
+
+
+class _Timer:
+    __slots__ = ("stage", "start", "top_level")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.top_level = _enter()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        _exit()
+        observe(self.stage, seconds, self.top_level)
+        return False
+
+
+def timed(stage):
+    """Context manager timing one stage; a shared no-op when metrics are off."""
+    return _Timer(stage) if ENABLED else _NOOP
+
+
+def timed_fn(stage):
+    """Decorator form of ``timed``."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            top_level = _enter()
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                _exit()
+                observe(stage, seconds, top_level)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1, **labels):
+    if not ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug(json.dumps({"event": "count", "name": name, "labels": labels}, ensure_ascii=False))
+
+
+def register_cache(name, cache):
+    _caches[name] = cache
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _top_level.clear()
+
+
+# ===== Export =====
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(items):
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def snapshot():
+    """Plain-dict copy of everything collected so far."""
+    with _lock:
+        stages = {}
+        for stage, h in _histograms.items():
+            n, total = h[len(BUCKETS)], h[-1]
+            stages[stage] = {"count": n, "sum_s": total, "mean_ms": total / n * 1000 if n else 0.0,
+                             "top_level_s": _top_level.get(stage, 0.0)}
+        counters = [{"name": name, "labels": dict(items), "value": v} for (name, items), v in _counters.items()]
+    caches = {}
+    for name, cache in _caches.items():
+        lookups = cache.hits + cache.misses
+        caches[name] = {"hits": cache.hits, "misses": cache.misses,
+                        "hit_ratio": cache.hits / lookups if lookups else 0.0}
+    return {"stages": stages, "counters": counters, "caches": caches}
+
+
+def render_prometheus():
+    lines = ["# HELP askhr_stage_seconds Time spent per app stage.", "# TYPE askhr_stage_seconds histogram"]
+    with _lock:
+        for stage, h in sorted(_histograms.items()):
+            for i, bound in enumerate(BUCKETS):
+                lines.append(f"askhr_stage_seconds_bucket{_labels([('stage', stage), ('le', bound)])} {h[i]}")
+            lines.append(f"askhr_stage_seconds_bucket{_labels([('stage', stage), ('le', '+Inf')])} {h[len(BUCKETS)]}")
+            lines.append(f"askhr_stage_seconds_sum{_labels([('stage', stage)])} {h[-1]:.6f}")
+            lines.append(f"askhr_stage_seconds_count{_labels([('stage', stage)])} {h[len(BUCKETS)]}")
+        names = sorted({name for name, _ in _counters})
+        for name in names:
+            lines.append(f"# TYPE {name} counter")
+            for (n, items), v in sorted(_counters.items()):
+                if n == name:
+                    lines.append(f"{name}{_labels(items)} {v}")
+    caches = sorted(_caches.items())
+    if caches:
+        lines.append("# TYPE askhr_cache_hits_total counter")
+        lines.extend(f"askhr_cache_hits_total{_labels([('cache', name)])} {c.hits}" for name, c in caches)
+        lines.append("# TYPE askhr_cache_misses_total counter")
+        lines.extend(f"askhr_cache_misses_total{_labels([('cache', name)])} {c.misses}" for name, c in caches)
+        lines.append("# TYPE askhr_cache_hit_ratio gauge")
+        for name, c in caches:
+            lookups = c.hits + c.misses
+            lines.append(f"askhr_cache_hit_ratio{_labels([('cache', name)])} {c.hits / lookups if lookups else 0.0:.4f}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    atomic_write(path, render_prometheus())
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_http_server(port, host="127.0.0.1"):
+    """Serve /metrics from a daemon thread; returns the server, or None if the port cannot be bound."""
+    try:
+        server = ThreadingHTTPServer((host, port), _Handler)
+    except OSError as exc:
+        # Typically another replica on the same host already holds the port: run without the endpoint
+        log.warning("metrics endpoint not started on %s:%s: %s", host, port, exc)
+        return None
+    threading.Thread(target=server.serve_forever, name="askhr-metrics", daemon=True).start()
+    return server
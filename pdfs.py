@@ -0,0 +1,86 @@
+import hashlib
+from io import BytesIO
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+
+from caching import LRUCache
+import metrics
+
+# Register Unicode font (covers Arabic table text in PDFs)
+pdfmetrics.registerFont(UnicodeCIDFont('STSong-Light'))
+
+# Rendered policy PDFs, shared by all sessions of this process
+policy_pdf_cache = LRUCache(max_items=64, max_bytes=32 * 1024 * 1024)
+metrics.register_cache("policy_pdf", policy_pdf_cache)
+
+
+# ===== PDF builders =====
+# `target` is a filename or any writable binary file object.
+def generate_employee_pdf(df, target):
+    doc = SimpleDocTemplate(target, pagesize=A4)
+    data = [["Field", "Value"]]
+    for col in df.columns:
+        data.append([col, str(df.iloc[0][col])])
+    table = Table(data, colWidths=[180, 340])
+    table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), 'STSong-Light'),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ]))
+    story = [table]
+    doc.build(story)
+    return target
+
+
+def generate_policy_section_pdf(title, content, target):
+    doc = SimpleDocTemplate(target, pagesize=A4)
+    styles = getSampleStyleSheet()
+    story = [Paragraph(title, styles["Title"]), Spacer(1, 12),
+             Paragraph(content.replace("\n", "<br/>"), styles["BodyText"])]
+    doc.build(story)
+    return target
+
+
+# ===== In-memory rendering =====
+@metrics.timed_fn("pdf_employee")
+def render_employee_pdf(df):
+    buf = BytesIO()
+    generate_employee_pdf(df, buf)
+    return buf.getvalue()
+
+
+@metrics.timed_fn("pdf_policy")
+def render_policy_section_pdf(title, content):
+    buf = BytesIO()
+    generate_policy_section_pdf(title, content, buf)
+    return buf.getvalue()
+
+
+def policy_pdf_key(title, content):
+    return hashlib.sha1(f"{title}\0{content}".encode("utf-8")).hexdigest()
+
+
+def get_policy_section_pdf(title, content):
+    """PDF bytes for a policy section, rendered at most once per distinct title/content."""
+    return policy_pdf_cache.get_or_create(policy_pdf_key(title, content),
+                                          lambda: render_policy_section_pdf(title, content))
+
+
+def prewarm_policy_pdfs(sections):
+    for title, content in sections.items():
+        if title[:1].isdigit():
+            get_policy_section_pdf(title, content)
+    return len(policy_pdf_cache)
+
+
+def pdf_filename(title):
+    return f"section_{title.replace(' ', '_')}.pdf"
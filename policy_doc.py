@@ -0,0 +1,163 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+from metrics import timed_fn
+from policy_index import tokenize
+
+POLICY_PATH = "capital_partners_policy.txt"
+MIN_TOC_ENTRIES = 3
+_NUMBERED_HEADING = re.compile(r"^\d{1,3}\.\s+\S.{0,98}$")
+_SENTENCE_END = re.compile(r"(?<=[.!?؟])\s")
+
+# Offsets are into the decoded text (start/end) and the UTF-8 file (byte_start/byte_end);
+# they span the content after the heading line up to the next heading.
+Section = namedtuple("Section", ["title", "start", "end", "byte_start", "byte_end", "content", "summary",
+                                 "digest", "tokens"])
+
+
+def _norm(line):
+    return line.strip().rstrip(".:").strip()
+
+
+def _lines(text):
+    """(line, char offset, byte offset) for every line, newline included."""
+    out = []
+    char_pos = byte_pos = 0
+    for line in text.splitlines(keepends=True):
+        out.append((line, char_pos, byte_pos))
+        char_pos += len(line)
+        byte_pos += len(line.encode("utf-8"))
+    return out, char_pos, byte_pos
+
+
+# ===== Heading detection =====
+def detect_headings(lines):
+    """Line indices of the section headings, in document order.
+
+    The table of contents is the first run of short lines ending in "." whose text is
+    repeated later as a standalone line; each repetition is a heading. Documents
+    without such a run fall back to numbered "N. Title" lines.
+    """
+    norms = [_norm(line) for line, _, _ in lines]
+    seen = {}
+    for i, n in enumerate(norms):
+        if n:
+            seen.setdefault(n, []).append(i)
+
+    toc = []
+    for i, (line, _, _) in enumerate(lines):
+        s = line.strip()
+        entry = s.endswith(".") and len(s) <= 100 and len(seen.get(norms[i], ())) >= 2 and seen[norms[i]][0] == i
+        if entry and (not toc or i == toc[-1] + 1):
+            toc.append(i)
+        elif len(toc) >= MIN_TOC_ENTRIES:
+            break
+        else:
+            toc = [i] if entry else []
+
+    if len(toc) < MIN_TOC_ENTRIES:
+        return [i for i, n in enumerate(norms) if _NUMBERED_HEADING.match(n)]
+
+    headings = []
+    last = toc[-1]
+    for i in toc:
+        later = [j for j in seen[norms[i]] if j > last]
+        if later:
+            headings.append(later[0])
+            last = later[0]
+    return headings
+
+
+def _summary(title, content):
+    """First sentence of a section, skipping label lines such as "Introduction:"."""
+    for line in content.splitlines():
+        s = line.strip()
+        if not s or s.endswith(":") or _norm(s) == _norm(title) or _norm(title).endswith(_norm(s)):
+            continue
+        return _SENTENCE_END.split(s, 1)[0].rstrip(".")
+    return ""
+
+
+# ===== Document model =====
+class PolicyDocument:
+    """Parsed policy: sections with offsets, summaries and per-section tokens."""
+
+    def __init__(self, text, sections):
+        self.text = text
+        self.digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        self.sections = sections
+        self._by_title = {s.title: s for s in sections}
+        self.sections_dict = OrderedDict((s.title, s.content) for s in sections)
+
+    def __len__(self):
+        return len(self.sections)
+
+    def __getitem__(self, title):
+        return self._by_title[title]
+
+    def titles(self):
+        return [s.title for s in self.sections]
+
+    def numbered(self):
+        return [s for s in self.sections if s.title[:1].isdigit()]
+
+
+@timed_fn("parse_policy")
+def parse_policy(text, previous=None):
+    """Build a PolicyDocument; sections identical to ones in ``previous`` reuse its summary and tokens."""
+    if previous is not None and previous.text == text:
+        return previous
+    reusable = {(s.title, s.digest): s for s in previous.sections} if previous is not None else {}
+    lines, total_chars, total_bytes = _lines(text)
+    headings = detect_headings(lines)
+    sections = []
+    for n, idx in enumerate(headings):
+        title = _norm(lines[idx][0])
+        first = idx + 1
+        if first < len(lines):
+            start, byte_start = lines[first][1], lines[first][2]
+        else:
+            start, byte_start = total_chars, total_bytes
+        if n + 1 < len(headings):
+            end, byte_end = lines[headings[n + 1]][1], lines[headings[n + 1]][2]
+        else:
+            end, byte_end = total_chars, total_bytes
+        content = text[start:end].strip()
+        digest = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        old = reusable.get((title, digest))
+        if old is not None:
+            # Unchanged section: keep the derived data, only the offsets may have moved
+            sections.append(old._replace(start=start, end=end, byte_start=byte_start, byte_end=byte_end))
+        else:
+            sections.append(Section(title, start, end, byte_start, byte_end, content, _summary(title, content),
+                                    digest, tuple(tokenize(content))))
+    return PolicyDocument(text, sections)
+
+
+def parse_policy_sections(policy_text):
+    return parse_policy(policy_text).sections_dict
+
+
+# ===== File-backed cache =====
+_lock = threading.Lock()
+_current = {}  # path -> (mtime_ns, size, PolicyDocument)
+
+
+def load_policy_document(path=POLICY_PATH):
+    """The parsed policy for ``path``; re-parsed (incrementally) only when the file changes."""
+    st = os.stat(path)
+    cached = _current.get(path)
+    if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    with _lock:
+        cached = _current.get(path)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return cached[2]
+        with open(path, "r", encoding="utf-8") as file:
+            text = file.read()
+        doc = parse_policy(text, cached[2] if cached else None)
+        _current[path] = (st.st_mtime_ns, st.st_size, doc)
+        return doc
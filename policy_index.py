@@ -0,0 +1,125 @@
+import math
+import os
+import pickle
+import re
+from collections import Counter
+
+from caching import CACHE_DIR, atomic_write
+from metrics import timed_fn
+
+INDEX_FORMAT = 2  # bump when tokenization or the pickled layout changes
+
+# ===== Normalization =====
+_AR_DIACRITICS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u0640]")  # harakat, superscript alef, tatweel
+_AR_FOLD = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ى": "ي", "ة": "ه", "ؤ": "و", "ئ": "ي"})
+_TOKEN = re.compile(r"\w+")
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "by", "at", "from", "as", "is", "are",
+    "was", "be", "it", "this", "that", "i", "me", "my", "we", "our", "you", "your", "do", "does", "can", "what",
+    "how", "who", "if", "any", "all", "not", "no", "will", "should", "about",
+    "في", "من", "علي", "الي", "عن", "ما", "ماذا", "هل", "انا", "هو", "هي", "كيف", "مع", "او", "و", "ان", "لا",
+}
+
+
+def normalize_arabic(text):
+    return _AR_DIACRITICS.sub("", text).translate(_AR_FOLD)
+
+
+def stem_english(word):
+    """Light suffix stripper (a Porter step-1 subset): enough to fold plurals and verb forms."""
+    if len(word) <= 3 or not word.isascii():
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        word = word[:-3] + "y"
+    elif word.endswith(("sses", "xes", "zes", "ches", "shes")):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+    for suffix in ("ments", "ment", "ing", "ed"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[: -len(suffix)]
+            if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "lsz":
+                word = word[:-1]  # stopped -> stop
+            break
+    if len(word) > 3 and word.endswith("e"):
+        word = word[:-1]
+    return word
+
+
+def stem_arabic(word):
+    if len(word) > 4 and word.startswith(("ال", "وال", "بال", "فال", "كال", "لل")):
+        word = word[2:] if word.startswith(("ال", "لل")) else word[3:]
+    return word
+
+
+def tokenize(text):
+    tokens = []
+    for tok in _TOKEN.findall(normalize_arabic(text.lower())):
+        if tok in STOPWORDS or tok.isdigit():
+            continue
+        tokens.append(stem_english(tok) if tok.isascii() else stem_arabic(tok))
+    return tokens
+
+
+# ===== BM25 index =====
+class PolicyIndex:
+    """Inverted index over policy sections, scored with Okapi BM25."""
+
+    def __init__(self, sections, k1=1.5, b=0.75, tokenized=None):
+        self.k1, self.b = k1, b
+        self.titles = []
+        self.doc_len = []
+        self.postings = {}
+        tokenized = tokenized or {}
+        for doc_id, (title, content) in enumerate(sections.items()):
+            content_tokens = tokenized.get(title)
+            if content_tokens is None:
+                content_tokens = tokenize(content)
+            # Title tokens count twice so a section's headline outweighs a passing mention
+            tokens = tokenize(title) * 2 + list(content_tokens)
+            self.titles.append(title)
+            self.doc_len.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                self.postings.setdefault(term, []).append((doc_id, tf))
+        n = len(self.titles)
+        self.avg_len = (sum(self.doc_len) / n) if n else 0.0
+        self.idf = {term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for term, p in self.postings.items()}
+        # Per-document length normalisation is query-independent, so precompute it
+        self._norm = [k1 * (1 - b + b * dl / self.avg_len) if self.avg_len else k1 for dl in self.doc_len]
+
+    @timed_fn("policy_search")
+    def search(self, query, k=3):
+        """Return up to ``k`` (title, score) pairs, best first; empty when nothing in the query is indexed."""
+        scores = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + self._norm[doc_id])
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.titles[doc_id], score) for doc_id, score in best]
+
+
+def _cache_path(digest):
+    return os.path.join(CACHE_DIR, f"policy_index-v{INDEX_FORMAT}-{digest[:16]}.pkl")
+
+
+@timed_fn("policy_index_load")
+def load_or_build_index(doc):
+    """Load the persisted index for this exact policy document, building and saving it on a miss."""
+    path = _cache_path(doc.digest)
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        pass
+    # Reuses the per-section tokens the document model already computed
+    index = PolicyIndex(doc.sections_dict, tokenized={s.title: s.tokens for s in doc.sections})
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        atomic_write(path, lambda f: pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL))
+    except OSError:
+        pass  # read-only deploys still get the in-memory index
+    return index
@@ -0,0 +1,189 @@
+"""Employee table and PIN list shared by every app replica on a host.
+
+One loader publishes the data as Arrow IPC files in a shared directory (tmpfs
+/dev/shm by default, so the pages live in shared memory) plus a ``current.json``
+pointer that is swapped atomically. Replicas memory-map the files zero-copy and
+materialise only the rows they look up, so adding replicas does not add copies.
+Replicas remap on their next lookup after a new version is published.
+
+    python shared_data.py publish      # load (snapshot) and publish the current sources
+    python shared_data.py info
+
+Run the app with ASKHR_SHARED_DATA=1 to attach instead of loading locally.
+Mixed-type object columns (e.g. ints and strings in one column) are published as
+strings, since Arrow columns need a single type.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc
+
+from caching import CACHE_DIR, atomic_write
+from employee_store import EmployeeIndex
+from matcher import EMPLOYEE_VIEWS
+from snapshot import XLSX_PATH, PIN_PATH, load_frames
+
+_DEFAULT_DIR = "/dev/shm/askhr" if os.path.isdir("/dev/shm") else os.path.join(CACHE_DIR, "shared")
+SHARED_DIR = os.environ.get("ASKHR_SHARED_DIR", _DEFAULT_DIR)
+POINTER = "current.json"
+KEEP_VERSIONS = 2  # the live version plus the one replicas may still be mapping
+
+
+# ===== Publishing =====
+def _arrow_table(df):
+    columns = {}
+    for name in df.columns:
+        col = df[name]
+        try:
+            columns[name] = pa.array(col, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            columns[name] = pa.array([None if pd.isna(v) else str(v) for v in col], type=pa.string())
+    return pa.table(columns)
+
+
+def _write_table(table, path):
+    def write(f):
+        with pa.ipc.new_file(f, table.schema) as writer:
+            writer.write_table(table)
+
+    atomic_write(path, write)
+
+
+def publish(df, pin_df, version, directory=SHARED_DIR):
+    """Write a new data version and point replicas at it. Returns the pointer dict."""
+    os.makedirs(directory, exist_ok=True)
+    version = str(version or int(time.time() * 1000))
+    pins = pin_df.assign(ECODE=pin_df["ECODE"].astype(str), PIN=pin_df["PIN"].astype(str))
+    files = {"employees": f"employees-{version}.arrow", "pins": f"pins-{version}.arrow"}
+    _write_table(_arrow_table(df), os.path.join(directory, files["employees"]))
+    _write_table(_arrow_table(pins[["ECODE", "PIN"]]), os.path.join(directory, files["pins"]))
+    pointer = {"version": version, "files": files, "rows": len(df), "published_at": time.time()}
+    atomic_write(os.path.join(directory, POINTER), json.dumps(pointer))
+    _prune(directory, pointer)
+    return pointer
+
+
+def _prune(directory, pointer):
+    # Unlinking is safe for replicas that already mapped a file: the pages stay valid until unmapped
+    versions = {}
+    for name in os.listdir(directory):
+        if name.endswith(".arrow") and "-" in name:
+            versions.setdefault(name.split("-", 1)[1][:-len(".arrow")], []).append(name)
+    ordered = sorted(versions, key=lambda v: os.path.getmtime(os.path.join(directory, versions[v][0])), reverse=True)
+    for stale in ordered[KEEP_VERSIONS:]:
+        if stale == pointer["version"]:
+            continue
+        for name in versions[stale]:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+# ===== Attaching =====
+def _map_table(path):
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+class SharedEmployeeStore(EmployeeIndex):
+    """EmployeeStore interface over memory-mapped Arrow tables; only looked-up rows become DataFrames."""
+
+    def __init__(self, table, pins, version):
+        super().__init__(table.column("ECODE").to_pylist(),
+                         zip(pins.column("ECODE").to_pylist(), pins.column("PIN").to_pylist()))
+        self.table = table
+        self.version = version
+        self._views = {}
+        for intent, (label, cols) in EMPLOYEE_VIEWS.items():
+            names = table.column_names if cols is None else [c for c in cols if c in table.column_names]
+            self._views[intent] = (label, table.select(names))
+
+    def _take(self, table, ecode):
+        positions = self._rows.get(ecode)
+        if not positions:
+            return table.slice(0, 0).to_pandas()
+        if len(positions) == 1:
+            return table.slice(positions[0], 1).to_pandas()
+        return table.take(positions).to_pandas()
+
+    def row(self, ecode):
+        return self._take(self.table, ecode)
+
+    def view(self, ecode, intent):
+        label, table = self._views[intent]
+        return label, self._take(table, ecode)
+
+
+def read_pointer(directory=SHARED_DIR):
+    try:
+        with open(os.path.join(directory, POINTER), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+_lock = threading.Lock()
+_attached = {}  # directory -> (pointer mtime_ns, SharedEmployeeStore)
+
+
+def attach(directory=SHARED_DIR):
+    """The store for the currently published version, remapped when a new one appears; None if none exists."""
+    try:
+        stamp = os.stat(os.path.join(directory, POINTER)).st_mtime_ns
+    except OSError:
+        return None
+    cached = _attached.get(directory)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    with _lock:
+        cached = _attached.get(directory)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        pointer = read_pointer(directory)
+        if pointer is None:
+            return cached[1] if cached else None
+        if cached is not None and cached[1].version == pointer["version"]:
+            store = cached[1]
+        else:
+            try:
+                store = SharedEmployeeStore(_map_table(os.path.join(directory, pointer["files"]["employees"])),
+                                            _map_table(os.path.join(directory, pointer["files"]["pins"])),
+                                            pointer["version"])
+            except (OSError, pa.ArrowInvalid):
+                # Pruned between reading the pointer and mapping; keep serving what we have
+                return cached[1] if cached else None
+        # Sessions holding the previous store keep its mapping until they drop it
+        _attached[directory] = (stamp, store)
+        return store
+
+
+# ===== CLI =====
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish or inspect the shared employee dataset.")
+    parser.add_argument("command", choices=["publish", "info"])
+    parser.add_argument("--dir", default=SHARED_DIR)
+    parser.add_argument("--xlsx", default=XLSX_PATH)
+    parser.add_argument("--pins", default=PIN_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "publish":
+        df, pin_df, version = load_frames(args.xlsx, args.pins)
+        pointer = publish(df, pin_df, version, args.dir)
+        print(f"published {pointer['version']} ({pointer['rows']} rows) to {args.dir}")
+        return 0
+    pointer = read_pointer(args.dir)
+    if pointer is None:
+        print(f"nothing published in {args.dir}")
+        return 1
+    print(json.dumps(pointer, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""Binary snapshot of the employee workbook and PIN list.
+
+Parsing PROLOGISTICS.xlsx with openpyxl dominates cold start, so the frames are
+converted once into Arrow IPC files (memory-mapped on load) or, for columns Arrow
+cannot type (mixed int/str cells), a pickle. The snapshot is keyed on the sources'
+mtime/size and content hash and on the pandas/pyarrow versions that wrote it; the
+workbook is only parsed again when it or those libraries change.
+
+Prebuild at deploy time:
+
+    python snapshot.py build
+    python snapshot.py info
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sys
+import time
+
+import pandas as pd
+
+from caching import CACHE_DIR, atomic_write
+from metrics import timed_fn
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # pickle-only snapshots
+    pa = None
+
+XLSX_PATH = "PROLOGISTICS.xlsx"
+PIN_PATH = "Employee_PIN_List.csv"
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, "data")
+SNAPSHOT_FORMAT = 1  # bump when the on-disk layout changes
+MANIFEST = "manifest.json"
+
+log = logging.getLogger("askhr.data")
+
+
+# ===== Source files =====
+def read_sources(xlsx_path=XLSX_PATH, pin_path=PIN_PATH):
+    """Slow path: parse the original files."""
+    return pd.read_excel(xlsx_path), pd.read_csv(pin_path)
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _stat(path):
+    st = os.stat(path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def _version(sources):
+    joined = "|".join(f"{name}:{meta['sha256']}" for name, meta in sorted(sources.items()))
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()[:16]
+
+
+# ===== Frame encoding =====
+def _write_frame(df, base):
+    """Write ``df`` as Arrow IPC when every column is typeable, else as a pickle. Returns the file name."""
+    table = None
+    if pa is not None:
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+    path = base + (".arrow" if table is not None else ".pkl")
+
+    def write(f):
+        if table is None:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+            return
+        with pa.ipc.new_file(f, table.schema) as writer:
+            writer.write_table(table)
+
+    atomic_write(path, write)
+    return os.path.basename(path)
+
+
+def _read_frame(path):
+    if path.endswith(".arrow"):
+        if pa is None:
+            # Snapshot built where pyarrow was installed; the caller rebuilds it as a pickle
+            raise ImportError(f"pyarrow is required to read {path}")
+        with pa.memory_map(path, "r") as source:
+            return pa.ipc.open_file(source).read_all().to_pandas()
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+# ===== Snapshot =====
+def _libraries():
+    # Pickles and Arrow pandas metadata are only reliably read back by the versions that wrote them
+    return {"pandas": pd.__version__, "pyarrow": pa.__version__ if pa is not None else None}
+
+
+def _read_manifest(snapshot_dir):
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format") != SNAPSHOT_FORMAT or manifest.get("libraries") != _libraries():
+        return None
+    return manifest
+
+
+def _is_fresh(manifest, paths, snapshot_dir):
+    """True when the manifest describes the current sources; touched-but-identical files are re-stamped."""
+    restamped = False
+    for name, path in paths.items():
+        meta = manifest["sources"].get(name)
+        if meta is None:
+            return False
+        current = _stat(path)
+        if current["mtime_ns"] == meta["mtime_ns"] and current["size"] == meta["size"]:
+            continue
+        if current["size"] != meta["size"] or file_digest(path) != meta["sha256"]:
+            return False
+        meta.update(current)
+        restamped = True
+    if restamped:
+        _write_manifest(manifest, snapshot_dir)
+    return True
+
+
+def _write_manifest(manifest, snapshot_dir):
+    atomic_write(os.path.join(snapshot_dir, MANIFEST), json.dumps(manifest, indent=2))
+
+
+def build_snapshot(xlsx_path=XLSX_PATH, pin_path=PIN_PATH, snapshot_dir=SNAPSHOT_DIR):
+    """Parse the sources and write a fresh snapshot. Returns (df, pin_df, manifest)."""
+    paths = {"employees": xlsx_path, "pins": pin_path}
+    sources = {}
+    for name, path in paths.items():
+        sources[name] = dict(_stat(path), sha256=file_digest(path))
+    df, pin_df = read_sources(xlsx_path, pin_path)
+    version = _version(sources)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    files = {
+        "employees": _write_frame(df, os.path.join(snapshot_dir, f"employees-{version}")),
+        "pins": _write_frame(pin_df, os.path.join(snapshot_dir, f"pins-{version}")),
+    }
+    manifest = {"format": SNAPSHOT_FORMAT, "libraries": _libraries(), "version": version, "sources": sources,
+                "files": files, "rows": {"employees": len(df), "pins": len(pin_df)}, "built_at": time.time()}
+    _write_manifest(manifest, snapshot_dir)
+    # Drop superseded files; a reader that already mapped one keeps a valid view until it closes it
+    for name in os.listdir(snapshot_dir):
+        if name.startswith(("employees-", "pins-")) and name not in files.values() and not name.endswith(".tmp"):
+            try:
+                os.remove(os.path.join(snapshot_dir, name))
+            except OSError:
+                pass
+    return df, pin_df, manifest
+
+
+@timed_fn("load_data")
+def load_frames(xlsx_path=XLSX_PATH, pin_path=PIN_PATH, snapshot_dir=SNAPSHOT_DIR):
+    """(df, pin_df, version) from the snapshot, rebuilding it if stale; parses the sources if it can't be written."""
+    paths = {"employees": xlsx_path, "pins": pin_path}
+    manifest = _read_manifest(snapshot_dir)
+    if manifest is not None and _is_fresh(manifest, paths, snapshot_dir):
+        try:
+            df = _read_frame(os.path.join(snapshot_dir, manifest["files"]["employees"]))
+            pin_df = _read_frame(os.path.join(snapshot_dir, manifest["files"]["pins"]))
+            return df, pin_df, manifest["version"]
+        except Exception as e:
+            # Corrupt, truncated or written by an incompatible library: whatever the error, rebuild it
+            log.warning("snapshot unreadable, rebuilding: %s", e)
+    try:
+        df, pin_df, manifest = build_snapshot(xlsx_path, pin_path, snapshot_dir)
+        return df, pin_df, manifest["version"]
+    except OSError:
+        df, pin_df = read_sources(xlsx_path, pin_path)
+        return df, pin_df, None
+
+
+# ===== CLI =====
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prebuild or inspect the employee data snapshot.")
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("--xlsx", default=XLSX_PATH)
+    parser.add_argument("--pins", default=PIN_PATH)
+    parser.add_argument("--dir", default=SNAPSHOT_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        start = time.perf_counter()
+        _, _, manifest = build_snapshot(args.xlsx, args.pins, args.dir)
+        print(f"built snapshot {manifest['version']} in {time.perf_counter() - start:.2f}s: "
+              f"{manifest['files']['employees']} ({manifest['rows']['employees']} rows), "
+              f"{manifest['files']['pins']} ({manifest['rows']['pins']} rows)")
+        return 0
+
+    manifest = _read_manifest(args.dir)
+    if manifest is None:
+        print("no snapshot")
+        return 1
+    fresh = _is_fresh(manifest, {"employees": args.xlsx, "pins": args.pins}, args.dir)
+    print(json.dumps(dict(manifest, fresh=fresh), indent=2))
+    return 0 if fresh else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
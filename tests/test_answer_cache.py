@@ -0,0 +1,102 @@
+"""Per-employee answer cache: TTL handling, ECODE isolation and invalidation on data reloads."""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import answer_cache  # noqa: E402
+import caching  # noqa: E402
+from answer_cache import employee_answer, on_data_change  # noqa: E402
+from caching import LRUCache  # noqa: E402
+from data_watcher import DataDiff  # noqa: E402
+from employee_store import EmployeeStore  # noqa: E402
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(caching, "time", clock)
+    return clock
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    answer_cache.answer_cache.clear()
+    monkeypatch.setattr(answer_cache, "render_employee_pdf", lambda row: f"pdf:{row['ECODE'].iloc[0]}".encode())
+    yield
+    answer_cache.answer_cache.clear()
+
+
+def make_store(version, salaries=None):
+    salaries = salaries or {"E1": 100, "E2": 200, "E3": 300}
+    df = pd.DataFrame({"ECODE": list(salaries), "BONUS": list(salaries.values())})
+    pins = pd.DataFrame({"ECODE": list(salaries), "PIN": ["111"] * len(salaries)})
+    return EmployeeStore(df, pins, version)
+
+
+def expiry(key):
+    return answer_cache.answer_cache._data[key][2]
+
+
+def test_rekey_keeps_expiry(clock):
+    cache = LRUCache(ttl=10, sizeof=len)
+    cache.put("old", "value")
+    clock.now += 6
+    assert cache.rekey("old", "new")
+    clock.now += 5
+    assert cache.get("new") is None  # expired on the original schedule, not 10s after the rekey
+
+
+def test_rekey_drops_expired_entry(clock):
+    cache = LRUCache(ttl=10, sizeof=len)
+    cache.put("old", "value")
+    clock.now += 11
+    assert not cache.rekey("old", "new")
+    assert len(cache) == 0 and cache.size_bytes == 0
+
+
+def test_adding_pdf_keeps_expiry(clock):
+    store = make_store("v1")
+    employee_answer(store, "E1", "profile")
+    key = ("E1", "v1", "profile")
+    expires = expiry(key)
+    clock.now += 5
+    answer = employee_answer(store, "E1", "profile", with_pdf=True)
+    assert answer.pdf == b"pdf:E1"
+    assert expiry(key) == expires
+
+
+def test_answers_never_cross_ecodes():
+    store = make_store("v1")
+    for ecode in ("E1", "E2", "E1", "E3", "E2"):
+        answer = employee_answer(store, ecode, "profile", with_pdf=True)
+        assert answer.ecode == ecode
+        assert list(answer.table["ECODE"]) == [ecode]
+        assert answer.pdf == f"pdf:{ecode}".encode()
+    # Even a poisoned entry under another employee's key is not served
+    answer_cache.answer_cache.put(("E1", "v1", "salary"), employee_answer(store, "E2", "salary"))
+    assert employee_answer(store, "E1", "salary").ecode == "E1"
+
+
+def test_data_change_drops_changed_and_removed(clock):
+    old = make_store("v1")
+    for ecode in ("E1", "E2", "E3"):
+        employee_answer(old, ecode, "profile")
+    kept_expiry = expiry(("E1", "v1", "profile"))
+    clock.now += 5
+    on_data_change(DataDiff("v1", "v2", added={"E4"}, removed={"E3"}, changed={"E2"}))
+    assert sorted(answer_cache.answer_cache.keys()) == [("E1", "v2", "profile")]
+    assert expiry(("E1", "v2", "profile")) == kept_expiry
+    new = make_store("v2", {"E1": 100, "E2": 250, "E4": 400})
+    assert list(employee_answer(new, "E2", "profile").table["BONUS"]) == [250]
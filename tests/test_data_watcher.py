@@ -0,0 +1,75 @@
+"""Hot reload of the employee data: per-ECODE diffs and no-op reloads."""
+import functools
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_watcher  # noqa: E402
+from data_watcher import DataWatcher  # noqa: E402
+from snapshot import load_frames  # noqa: E402
+
+EMPLOYEES = pd.DataFrame({"ECODE": ["E1", "E2", "E3"], "Name": ["Ann", "Bob", "Cy"], "BONUS": [100, 200, 300]})
+PINS = pd.DataFrame({"ECODE": ["E1", "E2", "E3"], "PIN": [111, 222, 333]})
+
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    # Keep the snapshot out of the working tree's cache directory
+    snapshot_dir = str(tmp_path / "data")
+    monkeypatch.setattr(data_watcher, "load_frames", functools.partial(load_frames, snapshot_dir=snapshot_dir))
+    xlsx, pins = str(tmp_path / "employees.xlsx"), str(tmp_path / "pins.csv")
+    EMPLOYEES.to_excel(xlsx, index=False)
+    PINS.to_csv(pins, index=False)
+    return xlsx, pins
+
+
+def bump_mtime(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_pin_change_marks_only_that_ecode(sources):
+    xlsx, pins = sources
+    watcher = DataWatcher(xlsx, pins)
+    PINS.assign(PIN=[111, 999, 333]).to_csv(pins, index=False)
+    bump_mtime(pins)
+    diff = watcher.check()
+    assert diff is not None and diff.new_version != diff.old_version
+    assert (diff.added, diff.removed, diff.changed) == (set(), set(), {"E2"})
+    assert watcher.store.authenticate("E2", "999") and not watcher.store.authenticate("E2", "222")
+
+
+def test_touch_with_identical_content_reloads_nothing(sources):
+    xlsx, pins = sources
+    watcher = DataWatcher(xlsx, pins)
+    store = watcher.store
+    seen = []
+    watcher.subscribe(seen.append)
+    bump_mtime(xlsx)
+    bump_mtime(pins)
+    assert watcher.check() is None
+    assert watcher.store is store and seen == []
+
+
+def test_schema_change_marks_every_surviving_ecode(sources):
+    xlsx, pins = sources
+    watcher = DataWatcher(xlsx, pins)
+    EMPLOYEES.assign(TRANSPORT=[10, 20, 30]).to_excel(xlsx, index=False)
+    bump_mtime(xlsx)
+    diff = watcher.check()
+    assert (diff.added, diff.removed, diff.changed) == (set(), set(), {"E1", "E2", "E3"})
+
+
+def test_row_change_and_new_employee(sources):
+    xlsx, pins = sources
+    watcher = DataWatcher(xlsx, pins)
+    employees = pd.concat([EMPLOYEES.assign(BONUS=[100, 200, 350]),
+                           pd.DataFrame({"ECODE": ["E4"], "Name": ["Di"], "BONUS": [400]})], ignore_index=True)
+    employees.to_excel(xlsx, index=False)
+    bump_mtime(xlsx)
+    diff = watcher.check()
+    assert (diff.added, diff.removed, diff.changed) == ({"E4"}, set(), {"E3"})
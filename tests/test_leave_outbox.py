@@ -0,0 +1,100 @@
+"""Leave outbox delivery: idempotent enqueue, hand-off, retries and re-queueing."""
+import os
+import smtplib
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import leave_outbox  # noqa: E402
+from leave_outbox import MAX_ATTEMPTS, connect, deliver_batch, enqueue  # noqa: E402
+
+REQUEST = ("E0006", "Test Employee", "2026-11-02", "2026-11-06")
+
+
+class FakeSMTP:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def send_message(self, msg):
+        if self.fail:
+            raise smtplib.SMTPRecipientsRefused({msg["To"]: (550, b"mailbox unavailable")})
+        self.sent.append(msg)
+
+
+def refused():
+    raise ConnectionRefusedError(111, "Connection refused")
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = connect(str(tmp_path / "outbox.sqlite3"))
+    yield conn
+    conn.close()
+
+
+def make_due(conn):
+    # Skip the retry backoff instead of sleeping through it
+    conn.execute("UPDATE leave_requests SET next_attempt_at = 0 WHERE status = 'pending'")
+
+
+def status(conn, row_id):
+    return conn.execute("SELECT status, attempts FROM leave_requests WHERE id = ?", (row_id,)).fetchone()
+
+
+def test_duplicate_enqueue_returns_same_row(conn):
+    row, created = enqueue(conn, *REQUEST)
+    again, created_again = enqueue(conn, *REQUEST)
+    assert created and not created_again
+    assert again["id"] == row["id"]
+    assert conn.execute("SELECT COUNT(*) FROM leave_requests").fetchone()[0] == 1
+
+
+def test_handed_off_rows_are_never_claimed(conn):
+    row, _ = enqueue(conn, *REQUEST, deliver=False)
+    assert row["status"] == "handed_off"
+    smtp = FakeSMTP()
+    assert deliver_batch(conn, lambda: smtp) == (0, 0)
+    assert leave_outbox.claim(conn, now=row["created_at"] + 10 ** 6) == []
+    assert smtp.sent == []
+    assert tuple(status(conn, row["id"])) == ("handed_off", 0)
+
+
+def test_unreachable_server_does_not_use_up_attempts(conn):
+    row, _ = enqueue(conn, *REQUEST)
+    for _ in range(MAX_ATTEMPTS + 2):
+        make_due(conn)
+        assert deliver_batch(conn, refused) == (0, 1)
+    assert tuple(status(conn, row["id"])) == ("pending", 0)
+
+
+def test_fails_after_max_attempts(conn):
+    row, _ = enqueue(conn, *REQUEST)
+    smtp = FakeSMTP(fail=True)
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        make_due(conn)
+        assert deliver_batch(conn, lambda: smtp) == (0, 1)
+        assert status(conn, row["id"])["attempts"] == attempt
+    assert status(conn, row["id"])["status"] == "failed"
+    make_due(conn)
+    assert deliver_batch(conn, lambda: smtp) == (0, 0)
+
+
+def test_resubmitting_failed_request_requeues_it(conn):
+    row, _ = enqueue(conn, *REQUEST)
+    conn.execute("UPDATE leave_requests SET status = 'failed', attempts = ? WHERE id = ?", (MAX_ATTEMPTS, row["id"]))
+    again, created = enqueue(conn, *REQUEST)
+    assert not created and again["id"] == row["id"]
+    assert tuple(status(conn, row["id"])) == ("pending", 0)
+    smtp = FakeSMTP()
+    assert deliver_batch(conn, lambda: smtp) == (1, 0)
+    assert status(conn, row["id"])["status"] == "sent"
+    assert smtp.sent[0]["Message-ID"] == f"<leave-{row['idempotency_key']}@askhr>"
@@ -0,0 +1,63 @@
+"""Intent matching regressions: exact matching against the original keyword cascade, plus fuzzy edge cases."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import synth_queries  # noqa: E402
+from matcher import STAGES, IntentMatcher, get_matcher, load_triggers, normalize_query  # noqa: E402
+
+
+def cascade(rules, query, normalize=normalize_query):
+    """The original app.py lookup: first rule, in stage order, whose every clause has a keyword in the query."""
+    q = normalize(query)
+    for rule in rules:
+        if all(any(normalize(kw) in q for kw in clause) for clause in rule.clauses):
+            return rule.stage, rule.intent
+    return None
+
+
+@pytest.fixture(scope="module")
+def triggers():
+    return load_triggers()
+
+
+def test_exact_matching_matches_cascade(triggers):
+    matcher = IntentMatcher.from_triggers(dict(triggers, fuzzy={"enabled": False}))
+    for query in synth_queries(20_000, seed=1):
+        rule = matcher.match(query)
+        got = rule and (rule.stage, rule.intent)
+        assert got == cascade(matcher.rules, query), query
+        # Synthetic queries use the keywords verbatim, so Arabic folding must not change a single answer
+        assert got == cascade(matcher.rules, query, lambda text: text.lower().strip()), query
+
+
+def test_exact_matching_per_stage(triggers):
+    matcher = IntentMatcher.from_triggers(dict(triggers, fuzzy={"enabled": False}))
+    for query in synth_queries(2_000, seed=2):
+        for stage in STAGES:
+            rule = matcher.match(query, (stage,))
+            want = cascade([r for r in matcher.rules if r.stage == stage], query)
+            assert (rule and (rule.stage, rule.intent)) == want, (stage, query)
+
+
+@pytest.mark.parametrize("query", ["course", "course schedule", "familiar", "i am familiar with it",
+                                   "bones", "ethnic", "where is the parking", "inclusion", "police",
+                                   "coined", "joiner", "resort", "the hotel resort"])
+def test_fuzzy_does_not_match_other_words(query):
+    assert get_matcher().match(query) is None
+
+
+@pytest.mark.parametrize("typo, exact", [("salery", "salary"), ("sallary", "salary"), ("vacaton", "vacation"),
+                                         ("harasment at work", "harassment at work"), ("hire dat", "hire date"),
+                                         ("polcy", "policy"), ("socail security", "social security")])
+def test_fuzzy_matches_typos(typo, exact):
+    assert get_matcher().match(typo) == get_matcher().match(exact) is not None
+
+
+@pytest.mark.parametrize("bare, hamza", [("الاقارب", "الأقارب"), ("الاساءة", "الإساءة")])
+def test_arabic_hamza_folding(bare, hamza):
+    matcher = IntentMatcher.from_triggers(dict(load_triggers(), fuzzy={"enabled": False}))
+    assert matcher.match(bare) == matcher.match(hamza) is not None